@@ -0,0 +1,256 @@
+# Mode ASGI: logika route sama dengan app.py (routes.py), tapi I/O non-blocking
+# (httpx + Playwright async; parse dan SQLite di thread).
+# Jalankan lewat serve.py dengan SERVER_MODE=asgi.
+import asyncio
+from quart import Quart, Response, jsonify, request, send_file
+from quart.json.provider import DefaultJSONProvider
+import batch
+import catalog
+import encoding
+import http_client
+import images
+import metrics
+import routes
+import scraper
+from cache import cache
+from singleflight import aflight
+from config import CATALOG_SCHEDULER, IMAGE_PROXY, IMAGE_MAX_AGE
+
+class TimedJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        with metrics.phase("serialize"):
+            if "indent" in kwargs:
+                # mode debug: JSON rapi lewat json stdlib
+                return super().dumps(obj, **kwargs)
+            return encoding.dumps(obj, sort_keys=self.sort_keys, default=self.default)
+
+
+app = Quart(__name__)
+app.json = TimedJSONProvider(app)
+
+@app.before_serving
+async def _startup():
+    if CATALOG_SCHEDULER:
+        catalog.start_scheduler()
+
+@app.after_serving
+async def _shutdown():
+    await http_client.aclose()
+
+def _ndjson(rows):
+    fields = routes.fields(request)
+    return Response((app.json.dumps(encoding.project(row, fields)) + "\n" for row in rows),
+                    mimetype="application/x-ndjson")
+
+def _reply(reply):
+    if reply.body is None:
+        return "", reply.status, reply.headers or {}
+    response = jsonify(reply.body)
+    response.status_code = reply.status
+    response.headers.update(reply.headers or {})
+    return response
+
+async def _run(handler):
+    # logika route ada di routes.py (sama dengan app.py); I/O sync (SQLite, parse) lewat thread
+    return _reply(await routes.arun(handler))
+
+# --- TIMING PER REQUEST (Server-Timing + /metrics) ---
+@app.before_request
+async def _begin_timing():
+    metrics.begin(request.url_rule.rule if request.url_rule else "unmatched")
+
+@app.after_request
+async def _end_timing(response):
+    server_timing = metrics.end(response.status_code)
+    if server_timing:
+        response.headers["Server-Timing"] = server_timing
+    return response
+
+# --- KOMPRESI (gzip / brotli) ---
+@app.after_request
+async def _compress(response):
+    # didaftarkan sebelum _conditional supaya jalan sesudahnya: ETag dihitung dari body asli
+    if not isinstance(response.response, response.data_body_class) or "Content-Encoding" in response.headers \
+            or not encoding.compressible(response.mimetype, response.content_length or 0):
+        return response
+    response.vary.add("Accept-Encoding")
+    coding = encoding.negotiate(request.headers.get("Accept-Encoding"))
+    if coding:
+        response.set_data(encoding.compress(await response.get_data(), coding))
+        response.headers["Content-Encoding"] = coding
+    return response
+
+# --- ETAG DARI BODY (respons JSON yang tidak dari cache: katalog, index lokal, status) ---
+@app.after_request
+async def _conditional(response):
+    # didaftarkan setelah _end_timing supaya jalan lebih dulu (status 304 ikut tercatat)
+    if request.method == "GET" and response.status_code == 200 and response.mimetype == "application/json" \
+            and "ETag" not in response.headers:
+        await response.add_etag(weak=True)
+        await response.make_conditional(request)
+    return response
+
+# --- STATUS API ---
+@app.route("/", methods=["GET"])
+async def API_Status():
+    return jsonify(routes.status())
+
+# --- STATISTIK FETCH ---
+@app.route("/stats", methods=["GET"])
+async def API_Stats():
+    return jsonify(await asyncio.to_thread(routes.stats, aflight))
+
+# --- METRIK PROMETHEUS ---
+@app.route("/metrics", methods=["GET"])
+async def API_Metrics():
+    return Response(await asyncio.to_thread(metrics.registry.render), mimetype="text/plain; version=0.0.4")
+
+# --- DETAIL KOMIK ---
+@app.route('/manga/<slug>/', methods=['GET'])
+async def get_manga_detail(slug):
+    if routes.wants_stream(request):
+        return await _manga_detail_stream(slug)
+    return await _run(routes.manga_detail(request, slug))
+
+async def _manga_detail_stream(slug):
+    cached = await asyncio.to_thread(cache.peek, routes.detail_key(slug))
+    if cached is not None:
+        return _ndjson(routes.detail_rows(cached))
+    try:
+        rows = await scraper.amanga_detail_stream(slug)
+    except Exception as e:
+        return _reply(routes.error(e))
+    return _ndjson(rows)
+
+# --- ISI CHAPTER ---
+@app.route('/manga/<slug>/<chapter_slug>/', methods=['GET'])
+async def manga_content(slug, chapter_slug):
+    return await _run(routes.manga_content(request, slug, chapter_slug))
+
+# --- PROXY GAMBAR (chapter + thumbnail) ---
+@app.route("/img", methods=["GET"])
+async def image_proxy():
+    if not IMAGE_PROXY:
+        return jsonify({"error": "proxy gambar tidak aktif"}), 404
+    try:
+        path, mimetype, _ = await images.aget(request.args.get("u", ""), request.args.get("w", type=int),
+                                              request.args.get("fmt"))
+    except images.ImageError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return _reply(routes.error(e, 502))
+
+    # file di cache dinamai hash isinya: Range, If-None-Match dan If-Modified-Since ditangani send_file
+    return await send_file(path, mimetype=mimetype, conditional=True, cache_timeout=IMAGE_MAX_AGE)
+
+# --- BATCH DETAIL / ISI CHAPTER (NDJSON) ---
+@app.route("/batch", methods=["POST"])
+async def batch_fetch():
+    try:
+        items = batch.parse_items(await request.get_json(silent=True))
+    except batch.BatchError as e:
+        return jsonify({"error": str(e)}), 400
+
+    async def generate():
+        async for row in batch.arun(items):
+            yield app.json.dumps(row) + "\n"
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
+# --- KOMIK BY GENRE ---
+@app.route('/genre/<slug>/', methods=['GET'])
+async def get_manga_by_genre(slug):
+    if routes.wants_stream(request):
+        return await _manga_by_genre_stream(slug, *routes.genre_params(request))
+    return await _run(routes.manga_by_genre(request, slug))
+
+async def _manga_by_genre_stream(slug, orderby, limit):
+    cached = await asyncio.to_thread(cache.peek, routes.genre_key(slug, orderby, limit))
+    if cached is not None:
+        return _ndjson(cached)
+    rows = scraper.aiter_manga_by_genre(slug, orderby, limit)
+    try:
+        first = await rows.__anext__()
+    except StopAsyncIteration:
+        return _ndjson(())
+    except Exception as e:
+        return _reply(routes.error(e))
+
+    fields = routes.fields(request)
+
+    async def generate():
+        yield app.json.dumps(encoding.project(first, fields)) + "\n"
+        async for row in rows:
+            yield app.json.dumps(encoding.project(row, fields)) + "\n"
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
+# --- LIST SEMUA KOMIK ---
+@app.route("/list-semua-komik", methods=["GET"])
+async def list_semua():
+    return await _run(routes.daftar(request))
+
+# --- FITUR SEARCH ---
+@app.route("/search", methods=["GET"])
+async def search_komik():
+    return await _run(routes.search(request))
+
+# --- LIST KOMIK TERBARU ---
+@app.route('/latest', methods=['GET'])
+async def latest_komik():
+    return await _run(routes.latest(request))
+
+# --- LIST KOMIK TERPOPULER ---
+@app.route("/popular", methods=["GET"])
+async def popular_komik():
+    return await _run(routes.popular(request))
+
+# --- LIST GENRE ---
+@app.route("/genre/", methods=["GET"])
+async def List_Genre():
+    return await _run(routes.genre_list(request))
+
+# --- LIST SEMUA MANGA ---
+@app.route("/list-manga", methods=["GET"])
+async def semua_manga():
+    return await _run(routes.daftar(request, "manga"))
+
+# --- LIST SEMUA MANHWA ---
+@app.route("/list-manhwa", methods=["GET"])
+async def semua_manhwa():
+    return await _run(routes.daftar(request, "manhwa"))
+
+# --- LIST SEMUA MANHUA ---
+@app.route("/list-manhua", methods=["GET"])
+async def semua_manhua():
+    return await _run(routes.daftar(request, "manhua"))
+
+# --- LIST MANGA TERPOPULER ---
+@app.route('/popular-manga', methods=['GET'])
+async def popular_manga():
+    return await _run(routes.popular(request, "manga"))
+
+# --- LIST MANHUA TERPOPULAR ---
+@app.route("/popular-manhua", methods=["GET"])
+async def popular_manhua():
+    return await _run(routes.popular(request, "manhua"))
+
+# --- LIST MANHWA TERPOPULER ---
+@app.route("/popular-manhwa", methods=["GET"])
+async def popular_manhwa():
+    return await _run(routes.popular(request, "manhwa"))
+
+# --- LIST MANGA TERUPDATE ---
+@app.route("/latest-manga", methods=["GET"])
+async def latest_manga():
+    return await _run(routes.latest(request, "manga"))
+
+# --- LIST MANHUA TERUPDATE ---
+@app.route("/latest-manhua", methods=["GET"])
+async def latest_manhua():
+    return await _run(routes.latest(request, "manhua"))
+
+# --- LIST MANHWA TERUPDATE ---
+@app.route("/latest-manhwa", methods=["GET"])
+async def latest_manhwa():
+    return await _run(routes.latest(request, "manhwa"))
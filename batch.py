@@ -0,0 +1,142 @@
+import asyncio
+import contextvars
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import catalog
+import scraper
+from cache import cache
+from config import CACHE_TTL, BATCH_MAX_ITEMS, BATCH_CONCURRENCY
+
+# POST /batch: banyak detail komik / isi chapter dalam satu request.
+# Item diambil paralel lewat cache + single-flight yang sama dengan route
+# /manga/<slug>/ dan /manga/<slug>/<chapter_slug>/, lalu dikirim satu per
+# baris (NDJSON) sesuai urutan selesai. Error per item tidak menggagalkan batch.
+
+
+class BatchError(ValueError):
+    pass
+
+
+# slug komik / chapter: satu segmen path Komiku (huruf, angka, "-", "_", "."), tanpa "/", spasi, "." / ".."
+SLUG_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9._-]*")
+
+
+def parse_items(payload):
+    """Validasi body: {"items": ["slug", {"slug": ..., "chapter": ...}, ...]} -> [(slug, chapter)]."""
+    items = payload.get("items") if isinstance(payload, dict) else None
+    if not isinstance(items, list) or not items:
+        raise BatchError("Body JSON harus berisi 'items' (list slug atau {slug, chapter})")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise BatchError(f"Maksimum {BATCH_MAX_ITEMS} item per batch")
+
+    parsed = []
+    for i, item in enumerate(items):
+        if isinstance(item, str):
+            item = {"slug": item}
+        if not isinstance(item, dict):
+            raise BatchError(f"items[{i}] harus slug atau object {{slug, chapter}}")
+        slug = str(item.get("slug") or "").strip().strip("/")
+        chapter = str(item.get("chapter") or "").strip().strip("/") or None
+        if not slug:
+            raise BatchError(f"items[{i}].slug kosong")
+        if not SLUG_RE.fullmatch(slug):
+            raise BatchError(f"items[{i}].slug tidak valid")
+        if chapter is not None and not SLUG_RE.fullmatch(chapter):
+            raise BatchError(f"items[{i}].chapter tidak valid")
+        parsed.append((slug, chapter))
+    return parsed
+
+
+def _row(index, slug, chapter):
+    row = {"index": index, "slug": slug}
+    if chapter:
+        row["chapter"] = chapter
+    return row
+
+
+# --- SYNC (app.py) ---
+def load(slug, chapter):
+    # detail (chapter None) atau isi chapter lewat cache yang sama dengan route; dipakai juga prefetch.py
+    if chapter:
+        return cache.get_or_load(f"chapter:{slug}:{chapter}", CACHE_TTL["chapter"],
+                                 lambda: scraper.chapter_content(slug, chapter))
+    return cache.get_or_load(f"detail:{slug}", CACHE_TTL["detail"],
+                             lambda: catalog.remember_detail(slug, scraper.manga_detail(slug)))
+
+
+def _result(index, slug, chapter):
+    row = _row(index, slug, chapter)
+    try:
+        row["data"] = load(slug, chapter)
+    except Exception as e:
+        row["error"] = str(e)
+    return row
+
+
+# Satu executor untuk semua batch: total fetch paralel dari /batch tetap dibatasi
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max(1, BATCH_CONCURRENCY), thread_name_prefix="batch")
+        return _executor
+
+
+def run(items):
+    """Generator hasil per item, urut selesai."""
+    pool = _pool()
+    futures = [pool.submit(contextvars.copy_context().run, _result, i, slug, chapter)
+               for i, (slug, chapter) in enumerate(items)]
+    try:
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        # client putus di tengah stream: item yang belum mulai tidak perlu diambil
+        for future in futures:
+            future.cancel()
+
+
+# --- ASYNC (asgi.py) ---
+async def _aload(slug, chapter):
+    if chapter:
+        return await cache.aget_or_load(f"chapter:{slug}:{chapter}", CACHE_TTL["chapter"],
+                                        lambda: scraper.achapter_content(slug, chapter))
+    return await cache.aget_or_load(f"detail:{slug}", CACHE_TTL["detail"],
+                                    lambda: catalog.aremember_detail(slug, scraper.amanga_detail(slug)))
+
+
+_semaphores = {}
+
+
+def _semaphore():
+    loop = asyncio.get_running_loop()
+    sem = _semaphores.get(loop)
+    if sem is None:
+        sem = _semaphores[loop] = asyncio.Semaphore(max(1, BATCH_CONCURRENCY))
+    return sem
+
+
+async def _aresult(index, slug, chapter):
+    row = _row(index, slug, chapter)
+    async with _semaphore():
+        try:
+            row["data"] = await _aload(slug, chapter)
+        except Exception as e:
+            row["error"] = str(e)
+    return row
+
+
+async def arun(items):
+    tasks = [asyncio.ensure_future(_aresult(i, slug, chapter)) for i, (slug, chapter) in enumerate(items)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
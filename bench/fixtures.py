@@ -0,0 +1,216 @@
+# Fixture HTML untuk benchmark offline (bench/run.py).
+#
+#   python bench/fixtures.py            -> tulis ulang fixture sintetis (deterministik)
+#   python bench/fixtures.py --record   -> rekam halaman asli dari BASE_URL (butuh jaringan)
+#   python bench/fixtures.py --from-snapshots -> pakai snapshot terakhir dari SNAPSHOT_DIR (tanpa jaringan)
+#
+# Fixture sintetis meniru struktur markup Komiku (shell halaman, kartu div.bge,
+# div.ls4, tabel #Daftar_Chapter, #Baca_Komik, select genre) dengan ukuran
+# yang mendekati halaman asli. Nama file sama untuk kedua mode, jadi hasil
+# rekaman bisa langsung menggantikan fixture sintetis.
+import argparse
+import os
+import random
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(HERE, "fixtures")
+
+SLUG = "bench-komik"
+CHAPTER = "chapter-1"
+TIPE = ["Manga", "Manhwa", "Manhua"]
+GENRES = ["Aksi", "Fantasi", "Komedi", "Drama", "Romantis", "Isekai", "Horor", "Misteri",
+          "Olahraga", "Sejarah", "Slice of Life", "Supernatural", "Psikologis", "Petualangan"]
+
+# nama fixture -> path upstream (relatif BASE_URL) untuk mode --record
+RECORD = {
+    "pustaka.html": "/pustaka/",
+    "pustaka_cards.html": "/pustaka/?orderby=modified&tipe=&genre=&genre2=&status=",
+    "genre_cards.html": "/genre/action/?orderby=update&page=1",
+    "search.html": "/?post_type=manga&s=one",
+    "daftar_komik.html": "/daftar-komik/page/1/",
+    "manga_detail.html": "/manga/one-piece/",
+    "chapter.html": "/one-piece-chapter-1/",
+}
+
+
+def _shell(title, body):
+    rng = random.Random(title)
+    nav = "".join(f'<li><a href="/genre/{g.lower().replace(" ", "-")}/">{g}</a></li>' for g in GENRES)
+    scripts = "".join(
+        f'<script>window.__d{k}={{"k":{rng.randint(0, 10**6)},"v":"{"x" * rng.randint(40, 200)}"}};</script>'
+        for k in range(12)
+    )
+    return (
+        f'<!DOCTYPE html><html lang="id"><head><meta charset="utf-8"><title>{title} - Komiku</title>'
+        '<meta name="viewport" content="width=device-width, initial-scale=1">'
+        '<link rel="stylesheet" href="/wp-content/themes/komiku/style.css">'
+        f'{scripts}</head><body><header id="header"><div class="hd2"><a href="/" class="logo">Komiku</a>'
+        f'<nav><ul class="menu">{nav}</ul></nav><form action="/" method="get"><input name="s">'
+        '<input type="hidden" name="post_type" value="manga"></form></div></header>'
+        f'<main id="Konten">{body}</main>'
+        '<footer id="Footer"><p>Komiku - baca komik online</p><ul>'
+        + "".join(f'<li><a href="/p/{k}/">Link {k}</a></li>' for k in range(20))
+        + '</ul></footer><script src="/wp-content/themes/komiku/htmx.min.js"></script></body></html>'
+    )
+
+
+def _bge(rng, i):
+    slug = f"komik-{i}"
+    tipe = TIPE[i % 3]
+    genre = rng.choice(GENRES)
+    awal, akhir = 1, rng.randint(20, 1200)
+    return (
+        f'<div class="bge"><div class="bgei"><a href="https://komiku.org/manga/{slug}/">'
+        f'<img src="https://thumbnail.komiku.org/uploads/2024/01/{slug}-thumb.jpg" alt="{slug}" loading="lazy">'
+        f'<div class="tpe1_inf"><b>{tipe}</b> {genre}</div></a></div>'
+        f'<div class="kan"><a href="/manga/{slug}/"><h3>Judul Komik Nomor {i}</h3></a>'
+        f'<span class="judul2"><span><b>{rng.randint(1, 999)}rb</b></span> pembaca | {rng.randint(1, 23)} jam lalu</span>'
+        f'<p>{" ".join(rng.choice(GENRES).lower() for _ in range(28))}.</p>'
+        f'<div class="new1"><a href="/{slug}-chapter-{awal:02d}/" title="Chapter {awal:02d}"><span>Awal:</span><span>Chapter {awal:02d}</span></a></div>'
+        f'<div class="new1"><a href="/{slug}-chapter-{akhir}/" title="Chapter {akhir}"><span>Terbaru:</span><span>Chapter {akhir}</span></a></div>'
+        '</div></div>'
+    )
+
+
+def cards_fragment(seed, n=30):
+    # respons HTMX /pustaka dan /genre: hanya potongan daftar kartu
+    rng = random.Random(seed)
+    return f'<div class="daftar">{"".join(_bge(rng, i) for i in range(n))}</div>'
+
+
+def pustaka_page():
+    opts = "".join(f'<option value="{g.lower().replace(" ", "-")}">{g}</option>' for g in GENRES * 5)
+    body = (
+        '<div class="pfr"><form><select name="tipe"><option value="">Tipe</option>'
+        '<option value="manga">Manga</option></select>'
+        f'<select name="genre"><option value="">Genre 1</option>{opts}</select>'
+        '<select name="genre2"><option value="">Genre 2</option></select></form></div>'
+        + cards_fragment("pustaka")
+    )
+    return _shell("Pustaka", body)
+
+
+def search_page():
+    return _shell("Cari", cards_fragment("search", n=20))
+
+
+def daftar_page(n=100):
+    rng = random.Random("daftar")
+    items = []
+    for i in range(n):
+        slug = f"komik-{i}"
+        genres = ", ".join(rng.sample(GENRES, 3))
+        items.append(
+            f'<div class="ls4"><div class="ls4v"><a href="/manga/{slug}/">'
+            f'<img class="lazy" data-src="https://thumbnail.komiku.org/uploads/{slug}.jpg" src="/lazy.gif"></a></div>'
+            f'<div class="ls4j"><h4><a href="/manga/{slug}/">Judul Komik Nomor {i}</a></h4>'
+            f'<span class="ls4s">Status: {rng.choice(["Ongoing", "End"])}</span>'
+            f'<span class="ls4s">Genre : {genres}</span></div></div>'
+        )
+    return _shell("Daftar Komik", f'<div class="ls4w">{"".join(items)}</div>')
+
+
+def detail_page(n=1100):
+    rng = random.Random("detail")
+    rows = "".join(
+        f'<tr><td class="judulseries"><a href="/{SLUG}-chapter-{c}/" title="Chapter {c}"><span>Chapter {c}</span></a></td>'
+        f'<td class="pembaca"><i>{rng.randint(100, 99999)}</i></td>'
+        f'<td class="tanggalseries">{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/20{rng.randint(15, 24)}</td></tr>'
+        for c in range(n, 0, -1)
+    )
+    body = (
+        f'<section id="Judul"><header><h1><span itemprop="name">Komik Bench</span></h1></header>'
+        f'<p class="j2">Bench Komik, ベンチ</p>'
+        f'<p itemprop="description" class="desc">{" ".join(rng.choice(GENRES).lower() for _ in range(120))}.</p>'
+        '<table class="inftable"><tr><td>Jenis</td><td>Manga</td></tr><tr><td>Status</td><td>Ongoing</td></tr></table>'
+        f'</section><section id="Chapter"><table id="Daftar_Chapter"><tbody>'
+        f'<tr><th>Chapter</th><th>Pembaca</th><th>Tanggal</th></tr>{rows}</tbody></table></section>'
+    )
+    return _shell("Komik Bench", body)
+
+
+def chapter_page(n=180):
+    imgs = "".join(
+        f'<img class="klazy ww" src="https://img.komiku.org/upload/{SLUG}/{CHAPTER}/{k:03d}.jpg" alt="{k}" loading="lazy">'
+        for k in range(n)
+    )
+    body = (
+        f'<div id="Judul"><header><h1>Komik Bench Chapter 1</h1></header><table class="tbl"><tbody>'
+        f'<tr><td>Judul</td><td>Komik Bench Chapter 1 Bahasa Indonesia</td></tr>'
+        f'<tr><td>Tanggal Rilis</td><td>01 Januari 2024</td></tr></tbody></table></div>'
+        f'<div id="Baca_Komik">{imgs}<img class="klazy" src="https://iklan.example/banner.jpg"></div>'
+    )
+    return _shell("Komik Bench Chapter 1", body)
+
+
+def empty_fragment():
+    return '<div class="daftar"></div>'
+
+
+SYNTHETIC = {
+    "pustaka.html": pustaka_page,
+    "pustaka_cards.html": lambda: cards_fragment("pustaka-cards"),
+    "genre_cards.html": lambda: cards_fragment("genre-cards"),
+    "search.html": search_page,
+    "daftar_komik.html": daftar_page,
+    "manga_detail.html": detail_page,
+    "chapter.html": chapter_page,
+    "empty.html": empty_fragment,
+}
+
+
+def load(name):
+    with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def write_synthetic():
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for name, build in SYNTHETIC.items():
+        with open(os.path.join(FIXTURE_DIR, name), "w", encoding="utf-8") as f:
+            f.write(build())
+
+
+def record():
+    sys.path.insert(0, os.path.dirname(HERE))
+    import http_client
+    from config import BASE_URL, HEADERS
+
+    for name, path in RECORD.items():
+        headers = dict(HEADERS, **{"HX-Current-URL": BASE_URL + path}) if name.endswith("_cards.html") else None
+        html = http_client.get_text(BASE_URL + path, headers=headers)
+        with open(os.path.join(FIXTURE_DIR, name), "w", encoding="utf-8") as f:
+            f.write(html)
+        print(f"{name}: {len(html)} byte")
+
+
+def from_snapshots():
+    sys.path.insert(0, os.path.dirname(HERE))
+    import snapshots
+    from config import BASE_URL
+
+    if snapshots.store is None:
+        sys.exit('SNAPSHOT_DIR=""')
+    for name, path in RECORD.items():
+        html = snapshots.store.load(BASE_URL + path)
+        if html is None:
+            print(f"{name}: belum ada snapshot {BASE_URL + path}, fixture lama dipakai")
+            continue
+        with open(os.path.join(FIXTURE_DIR, name), "w", encoding="utf-8") as f:
+            f.write(html)
+        print(f"{name}: {len(html)} byte")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tulis fixture HTML benchmark")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--record", action="store_true", help="rekam dari BASE_URL, bukan sintetis")
+    mode.add_argument("--from-snapshots", action="store_true", help="salin snapshot terakhir dari SNAPSHOT_DIR")
+    args = parser.parse_args()
+    if args.record:
+        record()
+    elif args.from_snapshots:
+        from_snapshots()
+    else:
+        write_synthetic()
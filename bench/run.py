@@ -0,0 +1,296 @@
+# Benchmark offline: parse time per halaman dan latensi end-to-end per route,
+# memakai fixture di bench/fixtures/ yang disajikan bench/server.py (tanpa jaringan).
+#
+#   python bench/run.py --out bench_output.json
+#   python bench/run.py --compare bench_output.json --threshold 1.2
+#
+# Hasil berupa JSON (lihat README). Dengan --compare, metrik dibandingkan dengan
+# hasil run sebelumnya dan exit code 1 kalau ada yang lebih lambat dari threshold.
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import fixtures
+import server
+
+ROOT = os.path.dirname(fixtures.HERE)
+
+# endpoint -> fixture yang di-parse (fungsi parse-nya di parse_functions())
+PARSE_CASES = {
+    "latest": "pustaka_cards.html",
+    "genre": "genre_cards.html",
+    "search": "search.html",
+    "list": "daftar_komik.html",
+    "detail": "manga_detail.html",
+    "chapter": "chapter.html",
+    "genres": "pustaka.html",
+}
+
+ROUTES = [
+    "/latest",
+    "/popular-manhwa",
+    "/genre/aksi/?limit=60",
+    "/search?q=one",
+    "/list-semua-komik?page=2",
+    "/list-manga",
+    "/manga/bench-komik/",
+    "/manga/bench-komik/chapter-1/",
+    "/genre/",
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[k]
+
+
+def summarize(seconds):
+    ms = [s * 1000 for s in seconds]
+    return {
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p90_ms": round(percentile(ms, 90), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "max_ms": round(max(ms), 3) if ms else 0.0,
+    }
+
+
+def peak_rss_kb():
+    # ru_maxrss: KB di Linux, byte di macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def fixture_digest():
+    h = hashlib.sha256()
+    for name in sorted(fixtures.SYNTHETIC):
+        h.update(name.encode())
+        h.update(fixtures.load(name).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+# --- PARSE ---
+def parse_functions():
+    import extract
+    import scraper
+
+    return {
+        "latest": extract.BGE_LISTING.extract,
+        "genre": extract.BGE_LISTING.extract,
+        "search": extract.BGE_SEARCH.extract,
+        "list": extract.LS4_LISTING.extract,
+        "detail": lambda html: scraper.parse_manga_detail(html, fixtures.SLUG),
+        "chapter": lambda html: scraper.parse_chapter(html, fixtures.SLUG, fixtures.CHAPTER),
+        "genres": scraper.parse_genre_list,
+    }
+
+
+def bench_parse(repeat):
+    functions = parse_functions()
+    results = {}
+    for endpoint, name in PARSE_CASES.items():
+        html = fixtures.load(name)
+        fn = functions[endpoint]
+        result = fn(html)
+        items = len(result.get("chapters") or result.get("page_images") or ()) if isinstance(result, dict) else len(result)
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn(html)
+            times.append(time.perf_counter() - start)
+        ms = [t * 1000 for t in times]
+        results[endpoint] = {
+            "fixture": name,
+            "bytes": len(html.encode("utf-8")),
+            "items": items,
+            "median_ms": round(percentile(ms, 50), 3),
+            "p90_ms": round(percentile(ms, 90), 3),
+            "min_ms": round(min(ms), 3),
+        }
+    return results
+
+
+# --- END-TO-END ---
+def _wsgi_requests(paths, concurrency):
+    from app import app
+
+    def one(path):
+        client = app.test_client()
+        start = time.perf_counter()
+        resp = client.get(path)
+        resp.get_data()
+        return path, resp.status_code, time.perf_counter() - start
+
+    with ThreadPoolExecutor(concurrency, thread_name_prefix="bench-client") as pool:
+        return list(pool.map(one, paths))
+
+
+def _asgi_requests(paths, concurrency):
+    from asgi import app
+
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+        client = app.test_client()
+
+        async def one(path):
+            async with semaphore:
+                start = time.perf_counter()
+                resp = await client.get(path)
+                await resp.get_data()
+                return path, resp.status_code, time.perf_counter() - start
+
+        async with app.test_app():
+            return await asyncio.gather(*(one(p) for p in paths))
+
+    return asyncio.run(run())
+
+
+def bench_e2e(mode, n, concurrency, warmup):
+    send = _asgi_requests if mode == "asgi" else _wsgi_requests
+    send([p for p in ROUTES for _ in range(warmup)], concurrency)
+
+    results = {}
+    total_requests = 0
+    total_wall = 0.0
+    for route in ROUTES:
+        start = time.perf_counter()
+        samples = send([route] * n, concurrency)
+        wall = time.perf_counter() - start
+        errors = sum(1 for _, status, _ in samples if status >= 400)
+        results[route] = dict(
+            summarize([t for _, _, t in samples]),
+            requests=n,
+            errors=errors,
+            throughput_rps=round(n / wall, 2) if wall else 0.0,
+        )
+        total_requests += n
+        total_wall += wall
+    return results, round(total_requests / total_wall, 2) if total_wall else 0.0
+
+
+# --- PERBANDINGAN ---
+def _metrics(report):
+    for endpoint, r in report["parse"].items():
+        yield f"parse.{endpoint}.median_ms", r["median_ms"], True
+    for route, r in report["e2e"]["routes"].items():
+        yield f"e2e.{route}.p50_ms", r["p50_ms"], True
+        yield f"e2e.{route}.p90_ms", r["p90_ms"], True
+    yield "e2e.throughput_rps", report["e2e"]["throughput_rps"], False
+    yield "rss.peak_kb", report["rss"]["peak_kb"], True
+
+
+def compare(old, new, threshold):
+    for key in ("fixtures", "mode", "concurrency", "upstream_delay_ms", "cache"):
+        if old["meta"].get(key) != new["meta"].get(key):
+            print(f"peringatan: {key} berbeda, hasil tidak sebanding", file=sys.stderr)
+    old_metrics = {name: value for name, value, _ in _metrics(old)}
+    regressions = []
+    print(f"{'metrik':<52} {'lama':>10} {'baru':>10} {'rasio':>7}")
+    for name, value, lower_is_better in _metrics(new):
+        before = old_metrics.get(name)
+        if not before or not value:
+            continue
+        ratio = value / before if lower_is_better else before / value
+        flag = " !" if ratio > threshold else ""
+        print(f"{name:<52} {before:>10} {value:>10} {ratio:>7.2f}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline mangaku")
+    parser.add_argument("--mode", choices=["wsgi", "asgi"], default="wsgi")
+    parser.add_argument("--requests", type=int, default=100, help="request per route")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=3, help="request pemanasan per route")
+    parser.add_argument("--parse-repeat", type=int, default=30)
+    parser.add_argument("--delay", type=float, default=5.0, help="latensi upstream buatan (ms)")
+    parser.add_argument("--cache", action="store_true", help="aktifkan cache respons (default: mati)")
+    parser.add_argument("--out", help="simpan hasil JSON ke file (default: stdout)")
+    parser.add_argument("--compare", help="hasil JSON run sebelumnya")
+    parser.add_argument("--threshold", type=float, default=1.2, help="rasio perlambatan maksimum")
+    args = parser.parse_args()
+
+    upstream = server.start(delay=args.delay / 1000)
+    base = f"http://127.0.0.1:{upstream.server_port}"
+    # config.py membaca env saat import, jadi harus diset sebelum modul aplikasi diimport
+    os.environ.update({
+        "BASE_URL": base,
+        "HTMX_BASE_URL": base,
+        "HTMX_DIRECT": "1",
+        "API_BASE": "http://bench.local",
+        "CACHE_ENABLED": "1" if args.cache else "0",
+        "CACHE_BACKEND": "",
+        # /list-* dan /search harus mengukur jalur scrape + parse, bukan katalog lokal yang kebetulan sudah di-crawl
+        "CATALOG_ENABLED": "0",
+    })
+    # server fixture lokal: token bucket hanya akan membatasi throughput benchmark
+    os.environ.setdefault("UPSTREAM_RATE", "0")
+    # halaman fixture tidak perlu masuk ke snapshot store
+    os.environ.setdefault("SNAPSHOT_DIR", "")
+    sys.path.insert(0, ROOT)
+
+    rss_start = peak_rss_kb()
+    parse = bench_parse(args.parse_repeat)
+    rss_parse = peak_rss_kb()
+    routes, throughput = bench_e2e(args.mode, args.requests, args.concurrency, args.warmup)
+    rss_e2e = peak_rss_kb()
+
+    import parsers
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parser_backend": parsers.BACKEND,
+            "fixtures": fixture_digest(),
+            "mode": args.mode,
+            "requests_per_route": args.requests,
+            "concurrency": args.concurrency,
+            "upstream_delay_ms": args.delay,
+            "cache": args.cache,
+        },
+        "parse": parse,
+        "e2e": {"routes": routes, "throughput_rps": throughput, "upstream_hits": upstream.hits},
+        "rss": {"start_kb": rss_start, "after_parse_kb": rss_parse, "peak_kb": rss_e2e},
+    }
+    upstream.shutdown()
+
+    out = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(out + "\n")
+    else:
+        print(out)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} metrik melewati threshold {args.threshold}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
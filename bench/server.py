@@ -0,0 +1,91 @@
+# Stand-in server Komiku untuk benchmark: menyajikan fixture dari bench/fixtures/
+# sesuai path upstream yang dipakai scraper.py, tanpa jaringan.
+#
+#   python bench/server.py --port 8765 --delay 20
+import argparse
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import fixtures
+
+# jumlah halaman /genre dan /pustaka yang berisi kartu, halaman setelahnya kosong
+CARD_PAGES = 3
+
+_DAFTAR_RE = re.compile(r"^/daftar-komik/(?:page/\d+/)?$")
+
+
+def route(path, query):
+    q = parse_qs(query)
+    page = int(q.get("page", ["1"])[0])
+    if path == "/pustaka/":
+        if not query:
+            return "pustaka.html"
+        return "pustaka_cards.html" if page <= CARD_PAGES else "empty.html"
+    if path.startswith("/genre/"):
+        return "genre_cards.html" if page <= CARD_PAGES else "empty.html"
+    if path == "/" and "s" in q:
+        return "search.html"
+    if _DAFTAR_RE.match(path):
+        return "daftar_komik.html"
+    if path.startswith("/manga/"):
+        return "manga_detail.html"
+    if "-chapter-" in path:
+        return "chapter.html"
+    return None
+
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, delay=0.0):
+        super().__init__(addr, Handler)
+        self.delay = delay
+        self.hits = 0
+        self._lock = threading.Lock()
+        self.pages = {name: fixtures.load(name).encode("utf-8") for name in fixtures.SYNTHETIC}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        name = route(url.path, url.query)
+        with self.server._lock:
+            self.server.hits += 1
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        if name is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = self.server.pages[name]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=UTF-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start(host="127.0.0.1", port=0, delay=0.0):
+    server = FixtureServer((host, port), delay)
+    threading.Thread(target=server.serve_forever, name="bench-upstream", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stand-in server Komiku dari fixture")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0, help="latensi upstream buatan (ms)")
+    args = parser.parse_args()
+    server = FixtureServer((args.host, args.port), args.delay / 1000)
+    print(f"fixture server di http://{args.host}:{server.server_port}")
+    server.serve_forever()
@@ -0,0 +1,368 @@
+import asyncio
+import atexit
+import logging
+import os
+import threading
+import time
+
+from urllib.parse import urlsplit
+
+from playwright.async_api import async_playwright
+
+import limiter
+import metrics
+from config import (
+    BASE_URL,
+    HTMX_BASE_URL,
+    TIMEOUT,
+    BROWSER_POOL_SIZE,
+    BROWSER_PAGES_PER_BROWSER,
+    BROWSER_MAX_NAVIGATIONS,
+    BROWSER_PROFILE,
+    BROWSER_BLOCK_RESOURCES,
+    BROWSER_ALLOWED_HOSTS,
+    BROWSER_EMPTY_SELECTOR,
+    BROWSER_EMPTY_QUIET_MS,
+)
+
+log = logging.getLogger(__name__)
+
+BROWSER_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# --single-process tidak dipakai lagi: browser sekarang hidup lama dan
+# melayani beberapa context sekaligus, mode itu tidak stabil untuk itu.
+LAUNCH_ARGS = [
+    "--no-sandbox",
+    "--disable-setuid-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+]
+
+# --- PROFIL RENDER "lean" ---
+# Dipasang di setiap document sebelum script halaman: hitung request HTMX yang selesai
+SETTLE_SCRIPT = """
+window.__mangakuSettled = 0;
+window.__mangakuPending = 0;
+window.__mangakuActivity = performance.now();
+const mangakuActive = () => { window.__mangakuActivity = performance.now(); };
+document.addEventListener("htmx:beforeRequest", () => { window.__mangakuPending++; mangakuActive(); });
+document.addEventListener("htmx:afterRequest", () => {
+    window.__mangakuPending = Math.max(0, window.__mangakuPending - 1); mangakuActive();
+});
+document.addEventListener("htmx:afterSettle", () => { window.__mangakuSettled++; mangakuActive(); });
+document.addEventListener("htmx:responseError", () => { window.__mangakuSettled++; mangakuActive(); });
+document.addEventListener("htmx:sendError", () => { window.__mangakuSettled++; mangakuActive(); });
+"""
+
+# "found" begitu selector ada dan tidak ada swap HTMX yang masih berjalan; "empty" kalau penanda kosong
+# muncul, atau HTMX sudah selesai minimal sekali tanpa kartu, tidak ada request HTMX berjalan dan sudah
+# diam selama quietMs (swap pertama bisa fragment lain yang memuat kartu lewat request berikutnya).
+# Halaman tanpa HTMX tetap menunggu selector sampai timeout (tidak dianggap kosong).
+WAIT_SCRIPT = """([selector, emptySelector, quietMs]) => {
+    if (document.querySelector(".htmx-request, .htmx-swapping, .htmx-settling")) return false;
+    if (document.querySelector(selector)) return "found";
+    if (emptySelector && document.querySelector(emptySelector)) return "empty";
+    if (window.__mangakuSettled > 0 && window.__mangakuPending === 0
+        && performance.now() - window.__mangakuActivity >= quietMs) return "empty";
+    return false;
+}"""
+
+
+def _site_host(url):
+    host = urlsplit(url or "").hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+# host situs + subdomain-nya (api., img., ...) dan host yang diizinkan eksplisit
+FIRST_PARTY = tuple(h for h in {_site_host(BASE_URL), _site_host(HTMX_BASE_URL), *BROWSER_ALLOWED_HOSTS} if h)
+
+
+def _first_party(url):
+    host = urlsplit(url).hostname or ""
+    return any(host == h or host.endswith("." + h) for h in FIRST_PARTY)
+
+
+class _Browser:
+    def __init__(self, browser):
+        self.browser = browser
+        self.navigations = 0
+        self.slots = 0
+        self.retiring = False
+
+
+class _Slot:
+    def __init__(self, owner, context, page):
+        self.owner = owner
+        self.context = context
+        self.page = page
+
+
+class BrowserPool:
+    """N browser x M page yang dipakai ulang, hidup di satu thread event loop.
+
+    Semua operasi Playwright berjalan di loop milik pool, sehingga route Flask
+    (thread mana pun) cukup memanggil render() dan menunggu hasilnya.
+    """
+
+    def __init__(self, size=BROWSER_POOL_SIZE, pages=BROWSER_PAGES_PER_BROWSER,
+                 max_navigations=BROWSER_MAX_NAVIGATIONS, profile=BROWSER_PROFILE):
+        self.size = max(1, size)
+        self.pages = max(1, pages)
+        self.max_navigations = max(1, max_navigations)
+        self.lean = profile == "lean"
+        self._lock = threading.Lock()
+        self._loop = None
+        self._pid = None
+        self._playwright = None
+        self._idle = None
+        self._browsers = set()
+        self._launches = 0
+        self._recycled = 0
+        self._leased = 0
+        self._blocked = 0
+        self._outcomes = {"found": 0, "empty": 0}
+
+    # --- lifecycle ---
+    def start(self):
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid():
+                return
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="browser-pool", daemon=True).start()
+            try:
+                asyncio.run_coroutine_threadsafe(self._start(), loop).result()
+            except Exception:
+                loop.call_soon_threadsafe(loop.stop)
+                raise
+            self._loop, self._pid = loop, os.getpid()
+
+    def stop(self):
+        with self._lock:
+            loop, self._loop = self._loop, None
+            if loop is None or self._pid != os.getpid():
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(self._stop(), loop).result(timeout=10)
+            except Exception as e:
+                log.warning("browser pool stop failed: %s", e)
+            loop.call_soon_threadsafe(loop.stop)
+
+    async def _start(self):
+        self._playwright = await async_playwright().start()
+        self._idle = asyncio.Queue()
+        self._browsers = set()
+        for _ in range(self.size):
+            await self._launch()
+
+    async def _stop(self):
+        for owner in list(self._browsers):
+            await self._close_browser(owner)
+        await self._playwright.stop()
+
+    async def _launch(self):
+        browser = await self._playwright.chromium.launch(headless=True, args=LAUNCH_ARGS)
+        owner = _Browser(browser)
+        browser.on("disconnected", lambda _: setattr(owner, "retiring", True))
+        self._browsers.add(owner)
+        self._launches += 1
+        try:
+            for _ in range(self.pages):
+                self._idle.put_nowait(await self._new_slot(owner))
+        except Exception:
+            # belum ada slot yang jadi: tutup browsernya, _relaunch mencoba lagi dari awal
+            if owner.slots <= 0:
+                await self._close_browser(owner)
+            raise
+
+    async def _new_slot(self, owner):
+        context = await owner.browser.new_context(user_agent=BROWSER_USER_AGENT)
+        if self.lean:
+            await context.route("**/*", self._intercept)
+            await context.add_init_script(SETTLE_SCRIPT)
+        page = await context.new_page()
+        owner.slots += 1
+        return _Slot(owner, context, page)
+
+    async def _close_browser(self, owner):
+        self._browsers.discard(owner)
+        try:
+            await owner.browser.close()
+        except Exception:
+            pass
+
+    async def _intercept(self, route):
+        # parser hanya membaca markup kartu: gambar, font, CSS, iklan dan analytics tidak perlu dimuat
+        request = route.request
+        try:
+            if request.resource_type in BROWSER_BLOCK_RESOURCES or not _first_party(request.url):
+                self._blocked += 1
+                await route.abort()
+            else:
+                await route.continue_()
+        except Exception:
+            # page/context sudah ditutup di tengah navigasi
+            pass
+
+    # --- lease ---
+    async def _lease(self, timeout):
+        while True:
+            slot = await asyncio.wait_for(self._idle.get(), timeout)
+            owner = slot.owner
+            if owner.retiring or not owner.browser.is_connected():
+                await self._drop(slot)
+                continue
+            if slot.page.is_closed():
+                # page mati tapi browser sehat: ganti context-nya saja
+                await self._drop(slot, relaunch=False)
+                try:
+                    slot = await self._new_slot(owner)
+                except Exception as e:
+                    # slot ini hilang: pensiunkan browser-nya, dan kalau ini slot terakhirnya
+                    # luncurkan pengganti supaya kapasitas pool kembali
+                    log.warning("browser context recreate failed: %s", e)
+                    owner.retiring = True
+                    if owner.slots <= 0:
+                        await self._recycle(owner)
+                    continue
+            self._leased += 1
+            return slot
+
+    async def _release(self, slot, healthy):
+        self._leased -= 1
+        owner = slot.owner
+        owner.navigations += 1
+        if not healthy or not owner.browser.is_connected() or owner.navigations >= self.max_navigations:
+            owner.retiring = True
+        if owner.retiring:
+            await self._drop(slot)
+        else:
+            self._idle.put_nowait(slot)
+
+    async def _drop(self, slot, relaunch=True):
+        owner = slot.owner
+        owner.slots -= 1
+        try:
+            await slot.context.close()
+        except Exception:
+            pass
+        if relaunch and owner.slots <= 0:
+            await self._recycle(owner)
+
+    async def _recycle(self, owner):
+        if owner in self._browsers:
+            await self._close_browser(owner)
+            self._recycled += 1
+            await self._relaunch()
+
+    async def _relaunch(self):
+        try:
+            await self._launch()
+        except Exception as e:
+            log.warning("browser relaunch failed, retrying: %s", e)
+            self._loop.call_later(5, lambda: asyncio.ensure_future(self._relaunch()))
+
+    # --- render ---
+    async def _render(self, url, selector, timeout, timings):
+        # timings diisi di thread loop pool, dicatat ke metrics oleh pemanggil (konteks request)
+        start = time.perf_counter()
+        slot = await self._lease(timeout / 1000)
+        timings["browser_lease"] = time.perf_counter() - start
+        healthy = True
+        try:
+            start = time.perf_counter()
+            if self.lean:
+                # tidak menunggu event load: resource sisa sudah diblokir, yang ditunggu hanya swap HTMX
+                await slot.page.goto(url, timeout=timeout, wait_until="domcontentloaded")
+                timings["browser_navigate"] = time.perf_counter() - start
+                start = time.perf_counter()
+                state = await slot.page.wait_for_function(WAIT_SCRIPT, arg=[selector, BROWSER_EMPTY_SELECTOR, BROWSER_EMPTY_QUIET_MS],
+                                                          timeout=timeout)
+                self._outcomes[await state.json_value()] += 1
+            else:
+                await slot.page.goto(url, timeout=timeout)
+                timings["browser_navigate"] = time.perf_counter() - start
+                start = time.perf_counter()
+                await slot.page.wait_for_selector(selector, timeout=timeout)
+            timings["browser_wait"] = time.perf_counter() - start
+            return await slot.page.content()
+        except Exception:
+            healthy = slot.owner.browser.is_connected() and not slot.page.is_closed()
+            raise
+        finally:
+            await self._release(slot, healthy)
+
+    def _ensure_started(self):
+        if self._loop is not None and self._pid == os.getpid():
+            return
+        try:
+            with metrics.phase("browser_launch"):
+                self.start()
+        except Exception:
+            metrics.upstream_error("browser_launch")
+            raise
+
+    @staticmethod
+    def _record(timings, error=None):
+        for name, seconds in timings.items():
+            metrics.record(name, seconds)
+        if error is not None:
+            kind = "browser_timeout" if "Timeout" in type(error).__name__ else "browser"
+            metrics.upstream_error(kind)
+
+    def render(self, url: str, selector: str = "div.bge", timeout: int = TIMEOUT) -> str:
+        self._ensure_started()
+        timings = {}
+        with limiter.slot(url, "browser"):
+            try:
+                html = asyncio.run_coroutine_threadsafe(self._render(url, selector, timeout, timings), self._loop).result()
+            except Exception as e:
+                self._record(timings, e)
+                raise
+        self._record(timings)
+        return html
+
+    async def render_async(self, url: str, selector: str = "div.bge", timeout: int = TIMEOUT) -> str:
+        self._ensure_started()
+        timings = {}
+        async with limiter.aslot(url, "browser"):
+            future = asyncio.run_coroutine_threadsafe(self._render(url, selector, timeout, timings), self._loop)
+            try:
+                html = await asyncio.wrap_future(future)
+            except Exception as e:
+                self._record(timings, e)
+                raise
+        self._record(timings)
+        return html
+
+    def stats(self):
+        return {
+            "browsers": len(self._browsers),
+            "pages_per_browser": self.pages,
+            "capacity": len(self._browsers) * self.pages,
+            "leased": self._leased,
+            "idle": self._idle.qsize() if self._idle is not None else 0,
+            "launches": self._launches,
+            "recycled": self._recycled,
+            "profile": "lean" if self.lean else "full",
+            "blocked_requests": self._blocked,
+            "outcomes": dict(self._outcomes),
+        }
+
+
+pool = BrowserPool()
+atexit.register(pool.stop)
+
+
+@metrics.registry.collector
+def _collect():
+    s = pool.stats()
+    utilization = s["leased"] / s["capacity"] if s["capacity"] else 0.0
+    yield "mangaku_browser_pages", "gauge", "Page browser per status", [
+        ({"state": "leased"}, s["leased"]), ({"state": "idle"}, s["idle"])]
+    yield "mangaku_browser_utilization", "gauge", "Rasio page browser yang sedang dipakai", [({}, round(utilization, 4))]
+    yield "mangaku_browser_launches_total", "counter", "Jumlah browser yang diluncurkan", [({}, s["launches"])]
+    yield "mangaku_browser_recycled_total", "counter", "Jumlah browser yang di-recycle", [({}, s["recycled"])]
+    yield "mangaku_browser_blocked_requests_total", "counter", "Request sub-resource yang diblokir profil lean", [
+        ({}, s["blocked_requests"])]
+    yield "mangaku_browser_renders_total", "counter", "Render browser per hasil tunggu (profil lean)", [
+        ({"outcome": name}, n) for name, n in s["outcomes"].items()]
@@ -0,0 +1,324 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import encoding
+import metrics
+from singleflight import flight, aflight
+from config import (
+    CACHE_ENABLED,
+    CACHE_MAX_BYTES,
+    CACHE_BACKEND,
+    CACHE_SQLITE_PATH,
+    CACHE_SQLITE_MMAP,
+    CACHE_STALE_TTL,
+    CACHE_REFRESH_WORKERS,
+)
+
+log = logging.getLogger(__name__)
+
+
+def digest(payload):
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:20]
+
+
+class Entry:
+    # etag: hash isi (JSON kanonik); changed_at: kapan isi terakhir berubah, bukan kapan disimpan
+    __slots__ = ("value", "fresh_until", "stale_until", "size", "etag", "changed_at")
+
+    def __init__(self, value, fresh_until, stale_until, size, etag=None, changed_at=None):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+        self.size = size
+        self.etag = etag
+        self.changed_at = changed_at
+
+
+class LRUCache:
+    """LRU in-process yang dibatasi total ukuran (byte JSON) entry."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old.size
+            self._data[key] = entry
+            self.bytes += entry.size
+            while self.bytes > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self.bytes -= evicted.size
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteBackend:
+    """Backend lokal bersama: beberapa worker bisa memakai file yang sama.
+
+    Dibaca lewat mmap (mmap_size): di tmpfs halaman file dipakai bersama semua worker,
+    bukan disalin ke buffer SQLite masing-masing proses.
+    """
+
+    PRUNE_EVERY = 500
+
+    def __init__(self, path, mmap_size=CACHE_SQLITE_MMAP):
+        self.path = path
+        self.mmap_size = mmap_size
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " fresh_until REAL NOT NULL, stale_until REAL NOT NULL)"
+        )
+        try:
+            # file cache lama belum punya kolom ini
+            conn.execute("ALTER TABLE cache ADD COLUMN changed_at REAL")
+        except sqlite3.OperationalError:
+            pass
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value, fresh_until, stale_until, changed_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[2] < time.time():
+            return None
+        return Entry(encoding.loads(row[0]), row[1], row[2], len(row[0]), digest(row[0]), row[3] or time.time())
+
+    def set(self, key, entry, payload):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, fresh_until, stale_until, changed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, payload, entry.fresh_until, entry.stale_until, entry.changed_at),
+        )
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            conn.execute("DELETE FROM cache WHERE stale_until < ?", (time.time(),))
+
+
+class TieredCache:
+    """L1 LRU in-process + L2 opsional, TTL per endpoint dan stale-while-revalidate.
+
+    Entry yang sudah lewat TTL tapi belum lewat stale_ttl tetap dikembalikan,
+    sementara refresh berjalan di background (satu refresh per key).
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, backend=None, stale_ttl=CACHE_STALE_TTL,
+                 refresh_workers=CACHE_REFRESH_WORKERS, enabled=CACHE_ENABLED):
+        self.enabled = enabled
+        self.l1 = LRUCache(max_bytes)
+        self.l2 = backend
+        self.stale_ttl = stale_ttl
+        self._refresh_workers = refresh_workers
+        self._executor = None
+        self._refreshing = set()
+        self._tasks = set()
+        self._lock = threading.Lock()
+        self._stats = {"hit": 0, "stale": 0, "miss": 0, "refresh": 0, "refresh_error": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _lookup(self, key):
+        entry = self.l1.get(key)
+        if entry is None and self.l2 is not None:
+            try:
+                entry = self.l2.get(key)
+            except sqlite3.Error as e:
+                log.warning("cache backend read failed: %s", e)
+                entry = None
+            if entry is not None:
+                self.l1.set(key, entry)
+        return entry
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        payload = encoding.dumps(value)
+        etag = digest(payload)
+        # refresh yang menghasilkan isi sama tidak memajukan Last-Modified
+        old = self.l1.get(key)
+        changed_at = old.changed_at if old is not None and old.etag == etag else now
+        entry = Entry(value, now + ttl, now + ttl + self.stale_ttl, len(payload), etag, changed_at)
+        self.l1.set(key, entry)
+        if self.l2 is not None:
+            try:
+                self.l2.set(key, entry, payload)
+            except sqlite3.Error as e:
+                log.warning("cache backend write failed: %s", e)
+        return entry
+
+    def peek(self, key):
+        """Nilai yang masih bisa dipakai (fresh atau stale) tanpa memuat ulang, atau None."""
+        if not self.enabled:
+            return None
+        entry = self._lookup(key)
+        now = time.time()
+        if entry is not None and now < entry.stale_until:
+            self._count("hit" if now < entry.fresh_until else "stale")
+            return entry.value
+        self._count("miss")
+        return None
+
+    def validators(self, key):
+        """(etag, changed_at, fresh_until) entry L1 untuk header HTTP, atau None. Tidak dihitung ke stats."""
+        if not self.enabled:
+            return None
+        entry = self.l1.get(key)
+        if entry is None or entry.etag is None:
+            return None
+        return entry.etag, entry.changed_at, entry.fresh_until
+
+    def get_or_load(self, key, ttl, loader):
+        if not self.enabled:
+            return loader()
+
+        entry = self._lookup(key)
+        now = time.time()
+        if entry is not None:
+            if now < entry.fresh_until:
+                self._count("hit")
+                return entry.value
+            if now < entry.stale_until:
+                self._count("stale")
+                self._schedule_refresh(key, ttl, loader)
+                return entry.value
+
+        self._count("miss")
+        return flight.do("load", key, lambda: self._load(key, ttl, loader))
+
+    def _load(self, key, ttl, loader):
+        value = loader()
+        self.set(key, value, ttl)
+        return value
+
+    def _schedule_refresh(self, key, ttl, loader):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self._refresh_workers, thread_name_prefix="cache-refresh")
+            executor = self._executor
+        executor.submit(self._refresh, key, ttl, loader)
+
+    def _refresh(self, key, ttl, loader):
+        try:
+            flight.do("load", key, lambda: self._load(key, ttl, loader))
+            self._count("refresh")
+        except Exception as e:
+            self._count("refresh_error")
+            log.warning("cache refresh %s failed: %s", key, e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    # --- versi async (mode ASGI): loader berupa coroutine function ---
+    async def aget_or_load(self, key, ttl, loader):
+        if not self.enabled:
+            return await loader()
+
+        # L2 (SQLite) dibaca di thread supaya event loop tidak tertahan
+        entry = self.l1.get(key)
+        if entry is None and self.l2 is not None:
+            entry = await asyncio.to_thread(self._lookup, key)
+        now = time.time()
+        if entry is not None:
+            if now < entry.fresh_until:
+                self._count("hit")
+                return entry.value
+            if now < entry.stale_until:
+                self._count("stale")
+                self._schedule_arefresh(key, ttl, loader)
+                return entry.value
+
+        self._count("miss")
+        return await aflight.do("load", key, lambda: self._aload(key, ttl, loader))
+
+    async def _aload(self, key, ttl, loader):
+        value = await loader()
+        if self.l2 is not None:
+            await asyncio.to_thread(self.set, key, value, ttl)
+        else:
+            self.set(key, value, ttl)
+        return value
+
+    def _schedule_arefresh(self, key, ttl, loader):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        task = asyncio.get_running_loop().create_task(self._arefresh(key, ttl, loader))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _arefresh(self, key, ttl, loader):
+        metrics.detach()
+        try:
+            await aflight.do("load", key, lambda: self._aload(key, ttl, loader))
+            self._count("refresh")
+        except Exception as e:
+            self._count("refresh_error")
+            log.warning("cache refresh %s failed: %s", key, e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["entries"] = len(self.l1)
+        stats["bytes"] = self.l1.bytes
+        stats["backend"] = type(self.l2).__name__ if self.l2 is not None else None
+        return stats
+
+
+cache = TieredCache(backend=SQLiteBackend(CACHE_SQLITE_PATH) if CACHE_BACKEND == "sqlite" else None)
+
+
+@metrics.registry.collector
+def _collect():
+    s = cache.stats()
+    lookups = s["hit"] + s["stale"] + s["miss"]
+    yield "mangaku_cache_lookups_total", "counter", "Lookup cache per hasil", [
+        ({"result": name}, s[name]) for name in ("hit", "stale", "miss")]
+    yield "mangaku_cache_hit_ratio", "gauge", "Rasio lookup yang dilayani dari cache (hit + stale)", [
+        ({}, round((s["hit"] + s["stale"]) / lookups, 4) if lookups else 0.0)]
+    yield "mangaku_cache_refresh_total", "counter", "Refresh background per hasil", [
+        ({"result": "ok"}, s["refresh"]), ({"result": "error"}, s["refresh_error"])]
+    yield "mangaku_cache_bytes", "gauge", "Ukuran L1 cache (byte JSON)", [({}, s["bytes"])]
+    yield "mangaku_cache_entries", "gauge", "Jumlah entry L1 cache", [({}, s["entries"])]
@@ -0,0 +1,439 @@
+# Katalog lokal semua judul dari /daftar-komik, disimpan di SQLite.
+#
+#   python catalog.py crawl     -> crawl penuh semua listing (semua, manga, manhwa, manhua)
+#   python catalog.py refresh   -> refresh inkremental dari urutan /latest
+#   python catalog.py run       -> loop scheduler (crawl + refresh berkala)
+#
+# /list-semua-komik dan /list-manga|manhwa|manhua membaca katalog ini kalau
+# listing-nya sudah pernah di-crawl, dan kembali scrape upstream kalau belum.
+# Judul baru dari refresh /latest langsung disisipkan ke listing yang sudah di-crawl
+# (semua + tipenya) di posisi urut abjad /daftar-komik; crawl penuh berikutnya
+# menyamakan lagi dengan upstream.
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import delta
+import images
+import metrics
+import scraper
+from extract import slug_of
+from config import (
+    CATALOG_ENABLED,
+    CATALOG_PATH,
+    CATALOG_CRAWL_CONCURRENCY,
+    CATALOG_MAX_PAGES,
+    CATALOG_CRAWL_INTERVAL,
+    CATALOG_REFRESH_INTERVAL,
+    CATALOG_LATEST_PAGES,
+)
+
+log = logging.getLogger(__name__)
+
+# "" = /daftar-komik (semua tipe), sisanya /daftar-komik/?tipe=<tipe>
+LISTINGS = ("", "manga", "manhwa", "manhua")
+
+# umur maksimum lease crawler, kalau prosesnya mati sebelum sempat melepas
+LOCK_TTL = 3600
+
+
+class Catalog:
+    """Tabel titles (satu baris per slug) + listing (urutan halaman per tipe)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(
+            "CREATE TABLE IF NOT EXISTS titles ("
+            " slug TEXT PRIMARY KEY, title TEXT NOT NULL, url TEXT NOT NULL, thumbnail TEXT,"
+            " tipe TEXT, genres TEXT NOT NULL DEFAULT '[]', updated_at REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS listing ("
+            " tipe TEXT NOT NULL, page INTEGER NOT NULL, position INTEGER NOT NULL, slug TEXT NOT NULL,"
+            " PRIMARY KEY (tipe, page, position));"
+            "CREATE TABLE IF NOT EXISTS details ("
+            " slug TEXT PRIMARY KEY, title TEXT, alt_title TEXT, description TEXT, updated_at REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS chapter_lists ("
+            " slug TEXT PRIMARY KEY, etag TEXT NOT NULL, latest TEXT, changed_at REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);"
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    # --- meta ---
+    def get_meta(self, key, default=None):
+        row = self._conn().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        self._conn().execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def acquire(self, name, ttl):
+        # lease antar proses/worker: hanya satu crawler yang jalan untuk `name`
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (f"lock:{name}",)).fetchone()
+            if row and float(row[0]) > now:
+                conn.execute("ROLLBACK")
+                return False
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (f"lock:{name}", str(now + ttl)))
+            conn.execute("COMMIT")
+            return True
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def release(self, name):
+        self._conn().execute("DELETE FROM meta WHERE key = ?", (f"lock:{name}",))
+
+    # --- baca ---
+    def page(self, tipe, page):
+        """Baris satu halaman listing, [] kalau lewat halaman terakhir, None kalau belum di-crawl."""
+        if self.get_meta(f"crawled:{tipe}") is None:
+            return None
+        rows = self._conn().execute(
+            "SELECT t.title, t.url, t.thumbnail, t.genres FROM listing l JOIN titles t ON t.slug = l.slug"
+            " WHERE l.tipe = ? AND l.page = ? ORDER BY l.position",
+            (tipe, page),
+        ).fetchall()
+        return [{"title": r[0], "url": r[1], "thumbnail": images.thumbnail_url(r[2]), "genres": json.loads(r[3])}
+                for r in rows]
+
+    def titles(self):
+        rows = self._conn().execute(
+            "SELECT t.slug, t.title, t.url, t.thumbnail, t.tipe, t.genres, d.alt_title, d.description"
+            " FROM titles t LEFT JOIN details d ON d.slug = t.slug"
+        ).fetchall()
+        return [{"slug": r[0], "title": r[1], "url": r[2], "thumbnail": r[3], "tipe": r[4],
+                 "genres": json.loads(r[5]), "alt_title": r[6] or "", "description": r[7] or ""} for r in rows]
+
+    def version(self):
+        # naik setiap kali isi katalog berubah, dipakai searchindex untuk tahu kapan rebuild
+        return int(self.get_meta("version", 0))
+
+    def _bump(self, conn):
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('version', '1')"
+            " ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+
+    # --- tulis ---
+    def store_listing(self, tipe, pages):
+        """Ganti seluruh listing `tipe` dengan hasil crawl {page: [row LS4_LISTING]} dalam satu transaksi."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM listing WHERE tipe = ?", (tipe,))
+            for page, rows in pages.items():
+                for position, row in enumerate(rows):
+                    slug = slug_of(row["url"])
+                    conn.execute(
+                        "INSERT INTO titles (slug, title, url, thumbnail, tipe, genres, updated_at)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                        " ON CONFLICT(slug) DO UPDATE SET title = excluded.title, url = excluded.url,"
+                        " thumbnail = excluded.thumbnail, genres = excluded.genres,"
+                        " tipe = COALESCE(excluded.tipe, titles.tipe), updated_at = excluded.updated_at",
+                        (slug, row["title"], row["url"], images.origin_url(row["thumbnail"]), tipe or None,
+                         json.dumps(row["genres"], ensure_ascii=False), now),
+                    )
+                    conn.execute("INSERT OR REPLACE INTO listing (tipe, page, position, slug) VALUES (?, ?, ?, ?)",
+                                 (tipe, page, position, slug))
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (f"crawled:{tipe}", str(now)))
+            self._bump(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def upsert_latest(self, rows):
+        """Perbarui judul dari kartu /latest (BGE_LISTING). Kembalikan jumlah slug yang belum dikenal.
+
+        Judul baru disisipkan ke listing "" dan listing tipenya (kalau diketahui) yang sudah di-crawl.
+        """
+        now = time.time()
+        conn = self._conn()
+        new = 0
+        added = {}
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for row in rows:
+                slug = slug_of(row["link"])
+                if not slug:
+                    continue
+                tipe = (row.get("type") or "").lower() or None
+                known = conn.execute("SELECT 1 FROM titles WHERE slug = ?", (slug,)).fetchone()
+                if known:
+                    conn.execute(
+                        "UPDATE titles SET title = ?, thumbnail = COALESCE(?, thumbnail),"
+                        " tipe = COALESCE(?, tipe), updated_at = ? WHERE slug = ?",
+                        (row["title"], images.origin_url(row["thumbnail"]), tipe, now, slug),
+                    )
+                else:
+                    new += 1
+                    for listing in ("", tipe) if tipe in LISTINGS else ("",):
+                        added.setdefault(listing, []).append((slug, row["title"]))
+                    genres = [row["genre"]] if row.get("genre") else []
+                    conn.execute(
+                        "INSERT INTO titles (slug, title, url, thumbnail, tipe, genres, updated_at)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (slug, row["title"], row["link"], images.origin_url(row["thumbnail"]), tipe,
+                         json.dumps(genres, ensure_ascii=False), now),
+                    )
+            for listing, titles in added.items():
+                self._insert_listing(conn, listing, titles)
+            self._bump(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return new
+
+    def _insert_listing(self, conn, tipe, titles):
+        # listing /daftar-komik urut abjad: sisipkan [(slug, title)] di posisinya, baris sesudahnya
+        # bergeser (halaman dibagi ulang dengan ukuran halaman 1). Dipanggil di dalam transaksi.
+        if self.get_meta(f"crawled:{tipe}") is None:
+            return
+        rows = conn.execute(
+            "SELECT l.slug, t.title FROM listing l JOIN titles t ON t.slug = l.slug"
+            " WHERE l.tipe = ? ORDER BY l.page, l.position",
+            (tipe,),
+        ).fetchall()
+        per_page = conn.execute("SELECT COUNT(*) FROM listing WHERE tipe = ? AND page = 1", (tipe,)).fetchone()[0]
+        if not rows or not per_page:
+            return
+        known = {slug for slug, _ in rows}
+        titles = [(slug, title) for slug, title in titles if slug not in known]
+        if not titles:
+            return
+        for slug, title in titles:
+            key = title.casefold()
+            index = next((i for i, (_, t) in enumerate(rows) if t.casefold() > key), len(rows))
+            rows.insert(index, (slug, title))
+        conn.execute("DELETE FROM listing WHERE tipe = ?", (tipe,))
+        conn.executemany(
+            "INSERT INTO listing (tipe, page, position, slug) VALUES (?, ?, ?, ?)",
+            [(tipe, i // per_page + 1, i % per_page, slug) for i, (slug, _) in enumerate(rows)],
+        )
+
+    def store_detail(self, slug, detail):
+        now = time.time()
+        chapters = detail.get("chapters") or []
+        tag = delta.etag(chapters)
+        latest = delta.chapter_slug(chapters[0]["url"]) if chapters else None
+        text = (detail.get("title", ""), detail.get("short_description", ""),
+                detail.get("long_description") or detail.get("sinopsis", ""))
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            old = conn.execute("SELECT title, alt_title, description FROM details WHERE slug = ?", (slug,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO details (slug, title, alt_title, description, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (slug, *text, now),
+            )
+            # changed_at hanya maju kalau daftar chapter benar-benar berubah
+            conn.execute(
+                "INSERT INTO chapter_lists (slug, etag, latest, changed_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(slug) DO UPDATE SET etag = excluded.etag, latest = excluded.latest,"
+                " changed_at = excluded.changed_at WHERE chapter_lists.etag != excluded.etag",
+                (slug, tag, latest, now),
+            )
+            # index search hanya memakai teks detail: versi tidak naik kalau teksnya sama
+            if old is None or tuple(old) != text:
+                self._bump(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def chapter_state(self, slug):
+        """(etag, chapter terbaru, waktu terakhir daftar chapter berubah) dari detail terakhir, atau None."""
+        return self._conn().execute(
+            "SELECT etag, latest, changed_at FROM chapter_lists WHERE slug = ?", (slug,)
+        ).fetchone()
+
+    def stats(self):
+        conn = self._conn()
+        stats = {"titles": conn.execute("SELECT COUNT(*) FROM titles").fetchone()[0], "listings": {}}
+        for tipe in LISTINGS:
+            crawled = self.get_meta(f"crawled:{tipe}")
+            count = conn.execute("SELECT COUNT(*) FROM listing WHERE tipe = ?", (tipe,)).fetchone()[0]
+            stats["listings"][tipe or "all"] = {
+                "titles": count,
+                "age": round(time.time() - float(crawled), 1) if crawled else None,
+            }
+        refreshed = self.get_meta("refreshed")
+        stats["refresh_age"] = round(time.time() - float(refreshed), 1) if refreshed else None
+        return stats
+
+
+catalog = Catalog(CATALOG_PATH) if CATALOG_ENABLED else None
+
+
+def lookup(tipe, page):
+    """Halaman listing dari katalog, atau None (katalog mati / belum di-crawl / error baca)."""
+    if catalog is None:
+        return None
+    try:
+        return catalog.page(tipe, page)
+    except sqlite3.Error as e:
+        log.warning("catalog read failed: %s", e)
+        return None
+
+
+def remember_detail(slug, detail):
+    """Simpan judul/alt/deskripsi dari halaman detail untuk index search lokal; kembalikan detail apa adanya."""
+    if catalog is not None:
+        try:
+            catalog.store_detail(slug, detail)
+        except sqlite3.Error as e:
+            log.warning("catalog detail write failed: %s", e)
+    return detail
+
+
+async def aremember_detail(slug, pending):
+    # tulis SQLite di thread (mode ASGI)
+    return await asyncio.to_thread(remember_detail, slug, await pending)
+
+
+# --- CRAWLER ---
+def crawl_listing(tipe, concurrency=CATALOG_CRAWL_CONCURRENCY, max_pages=CATALOG_MAX_PAGES):
+    """Ambil semua halaman satu listing, `concurrency` halaman sekaligus.
+
+    Berhenti di halaman kosong, atau halaman yang tidak berisi slug baru
+    (upstream mengulang halaman terakhir untuk nomor halaman di luar jangkauan).
+    """
+    pages = {}
+    seen = set()
+    page = 1
+    with ThreadPoolExecutor(max(1, concurrency), thread_name_prefix="catalog-crawl") as executor:
+        while page <= max_pages:
+            batch = list(range(page, min(page + concurrency, max_pages + 1)))
+            results = executor.map(lambda p: scraper.daftar_komik(page=p, tipe=tipe or None), batch)
+            for p, rows in zip(batch, results):
+                slugs = {slug_of(r["url"]) for r in rows}
+                if not rows or slugs <= seen:
+                    return pages
+                seen |= slugs
+                pages[p] = rows
+            page += len(batch)
+    return pages
+
+
+def crawl(listings=LISTINGS):
+    if catalog is None or not catalog.acquire("crawl", LOCK_TTL):
+        return False
+    try:
+        for tipe in listings:
+            start = time.perf_counter()
+            try:
+                pages = crawl_listing(tipe)
+            except Exception as e:
+                # listing lama tetap dipakai sampai crawl berikutnya berhasil
+                log.warning("catalog crawl %s failed: %s", tipe or "all", e)
+                continue
+            if pages:
+                catalog.store_listing(tipe, pages)
+            log.info("catalog crawl %s: %d halaman, %.1fs", tipe or "all", len(pages), time.perf_counter() - start)
+    finally:
+        catalog.release("crawl")
+    return True
+
+
+def refresh_latest(max_pages=CATALOG_LATEST_PAGES):
+    """Ikuti /latest (urutan update terbaru) sampai satu halaman tidak berisi judul baru."""
+    if catalog is None or not catalog.acquire("refresh", LOCK_TTL):
+        return None
+    new = 0
+    try:
+        for page in range(1, max_pages + 1):
+            rows = scraper.latest(page=page)
+            if not rows:
+                break
+            added = catalog.upsert_latest(rows)
+            new += added
+            if not added:
+                break
+        catalog.set_meta("refreshed", time.time())
+    finally:
+        catalog.release("refresh")
+    log.info("catalog refresh: %d judul baru", new)
+    return new
+
+
+def run_once():
+    crawled = catalog.get_meta(f"crawled:{LISTINGS[0]}")
+    if crawled is None or time.time() - float(crawled) >= CATALOG_CRAWL_INTERVAL:
+        crawl()
+    else:
+        refresh_latest()
+
+
+def _loop():
+    metrics.detach()
+    while True:
+        try:
+            run_once()
+        except Exception as e:
+            log.warning("catalog job failed: %s", e)
+        time.sleep(CATALOG_REFRESH_INTERVAL)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def start_scheduler():
+    """Thread background di dalam proses app (sekali per proses)."""
+    global _scheduler
+    if catalog is None:
+        return
+    with _scheduler_lock:
+        if _scheduler is not None and _scheduler[1] == os.getpid():
+            return
+        thread = threading.Thread(target=_loop, name="catalog-scheduler", daemon=True)
+        thread.start()
+        _scheduler = (thread, os.getpid())
+
+
+@metrics.registry.collector
+def _collect():
+    if catalog is None:
+        return
+    try:
+        s = catalog.stats()
+    except sqlite3.Error:
+        return
+    yield "mangaku_catalog_titles", "gauge", "Jumlah judul di katalog lokal", [({}, s["titles"])]
+    yield "mangaku_catalog_age_seconds", "gauge", "Umur crawl terakhir per listing", [
+        ({"listing": name}, v["age"]) for name, v in s["listings"].items() if v["age"] is not None]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="Crawler katalog mangaku")
+    parser.add_argument("command", choices=["crawl", "refresh", "run"])
+    args = parser.parse_args()
+    if catalog is None:
+        parser.error("CATALOG_ENABLED=0")
+    if args.command == "crawl":
+        crawl()
+    elif args.command == "refresh":
+        refresh_latest()
+    else:
+        _loop()
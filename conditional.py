@@ -0,0 +1,50 @@
+import hashlib
+import time
+
+from werkzeug.http import http_date, parse_date
+
+import delta
+from config import CACHE_STALE_TTL
+
+# Header validator (ETag / Last-Modified / Cache-Control) untuk respons JSON.
+# Respons dari cache memakai hash isi entry (dihitung sekali saat disimpan), jadi
+# If-None-Match yang cocok dijawab 304 sebelum body di-serialize.
+
+
+def etag(*parts):
+    digest = hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def cache_control(validators=None, ttl=None):
+    """max-age = sisa umur fresh entry cache (atau TTL penuh kalau tidak dari cache)."""
+    if validators is not None:
+        max_age = validators[2] - time.time()
+    elif ttl is not None:
+        max_age = ttl
+    else:
+        return None
+    return f"public, max-age={max(0, int(max_age))}, stale-while-revalidate={CACHE_STALE_TTL}"
+
+
+def headers(path, validators=None, ttl=None):
+    # path (dengan query) ikut di-hash: isi cache yang sama dibungkus beda per route/parameter
+    result = {}
+    if validators is not None:
+        digest, changed_at, _ = validators
+        result["ETag"] = etag(path, digest)
+        result["Last-Modified"] = http_date(changed_at)
+    control = cache_control(validators, ttl)
+    if control:
+        result["Cache-Control"] = control
+    return result
+
+
+def not_modified(request_headers, headers):
+    # If-None-Match didahulukan; If-Modified-Since hanya dipakai kalau tidak ada
+    if_none_match = request_headers.get("If-None-Match")
+    if if_none_match is not None:
+        return "ETag" in headers and delta.etag_matches(if_none_match, headers["ETag"])
+    since = parse_date(request_headers.get("If-Modified-Since"))
+    modified = parse_date(headers.get("Last-Modified"))
+    return since is not None and modified is not None and modified <= since
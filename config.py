@@ -8,10 +8,186 @@ USER_AGENT = os.getenv("USER_AGENT", "Mozilla/5.0")
 TIMEOUT = int(os.getenv("timeout", 30000))
 API_BASE = os.getenv("API_BASE", "http://127.0.0.1:3080")
 
+# Mode server untuk serve.py: "wsgi" (Flask, app.py) atau "asgi" (Quart async, asgi.py)
+SERVER_MODE = os.getenv("SERVER_MODE", "wsgi")
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+
+# Multi-proses (gunicorn, gunicorn.conf.py): app di-import sekali di master lalu di-fork ke SERVER_WORKERS
+# worker x SERVER_THREADS thread (WSGI). Worker yang diam > SERVER_TIMEOUT detik dibunuh; saat reload/stop
+# worker diberi SERVER_GRACEFUL_TIMEOUT detik untuk menyelesaikan request. SERVER_MAX_REQUESTS > 0 = worker
+# diganti setelah sekian request (browser/memori bocor tidak menumpuk).
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", 1))
+SERVER_THREADS = int(os.getenv("SERVER_THREADS", 8))
+SERVER_TIMEOUT = int(os.getenv("SERVER_TIMEOUT", 120))
+SERVER_GRACEFUL_TIMEOUT = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", 30))
+SERVER_MAX_REQUESTS = int(os.getenv("SERVER_MAX_REQUESTS", 0))
+# File yang dibagi antar worker (cache L2, token bucket): tmpfs /dev/shm kalau ada, jadi tetap di memori
+SHARED_DIR = os.getenv("SHARED_DIR", "/dev/shm" if os.path.isdir("/dev/shm") else "/tmp")
+
+# Browser pool (Playwright): N browser x M page, di-recycle setelah K navigasi
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", 1))
+BROWSER_PAGES_PER_BROWSER = int(os.getenv("BROWSER_PAGES_PER_BROWSER", 4))
+BROWSER_MAX_NAVIGATIONS = int(os.getenv("BROWSER_MAX_NAVIGATIONS", 200))
+
+# Profil render: "lean" = blokir tipe resource di BROWSER_BLOCK_RESOURCES dan host pihak ketiga (kecuali
+# BROWSER_ALLOWED_HOSTS, mis. CDN htmx), selesai begitu swap HTMX berisi kartu beres atau HTMX selesai tanpa
+# kartu (tidak ada hasil) / BROWSER_EMPTY_SELECTOR muncul. "full" = muat semua, tunggu selector sampai TIMEOUT.
+BROWSER_PROFILE = os.getenv("BROWSER_PROFILE", "lean")
+BROWSER_BLOCK_RESOURCES = frozenset(r.strip() for r in os.getenv(
+    "BROWSER_BLOCK_RESOURCES", "image,media,font,stylesheet,texttrack,manifest,websocket,eventsource,other").split(",") if r.strip())
+BROWSER_ALLOWED_HOSTS = tuple(h.strip() for h in os.getenv(
+    "BROWSER_ALLOWED_HOSTS", "unpkg.com,cdn.jsdelivr.net,cdnjs.cloudflare.com").split(",") if h.strip())
+BROWSER_EMPTY_SELECTOR = os.getenv("BROWSER_EMPTY_SELECTOR", "")
+# "Tidak ada hasil" baru diputuskan setelah tidak ada request HTMX berjalan selama sekian ms sejak aktivitas
+# HTMX terakhir (swap pertama bisa fragment lain yang memicu request kartu berikutnya)
+BROWSER_EMPTY_QUIET_MS = int(os.getenv("BROWSER_EMPTY_QUIET_MS", 500))
+
+# HTTP client: timeout dalam detik (TIMEOUT di atas dalam milidetik, khusus Playwright)
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 15))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", 2))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", 0.3))
+HTTP_BACKOFF_JITTER = float(os.getenv("HTTP_BACKOFF_JITTER", 0.3))
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", 4))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 32))
+
+# Limiter upstream per host: token bucket (request/detik + burst) lalu batas konkurensi adaptif (AIMD):
+# naik +1 per putaran request sukses, dikali UPSTREAM_BACKOFF kalau error/429/5xx atau lebih lambat dari
+# UPSTREAM_LATENCY_TARGET. Request yang tidak dapat slot dalam UPSTREAM_QUEUE_TIMEOUT (atau antrian penuh) -> 503.
+# UPSTREAM_RATE=0 mematikan token bucket; UPSTREAM_RATE_STORE=<file SQLite> membagi bucket antar worker.
+UPSTREAM_RATE = float(os.getenv("UPSTREAM_RATE", 8))
+UPSTREAM_BURST = int(os.getenv("UPSTREAM_BURST", 16))
+UPSTREAM_RATE_STORE = os.getenv(
+    "UPSTREAM_RATE_STORE", os.path.join(SHARED_DIR, "mangaku-ratelimit.sqlite3") if SERVER_WORKERS > 1 else "")
+UPSTREAM_CONCURRENCY = int(os.getenv("UPSTREAM_CONCURRENCY", 8))
+UPSTREAM_CONCURRENCY_MIN = int(os.getenv("UPSTREAM_CONCURRENCY_MIN", 2))
+UPSTREAM_CONCURRENCY_MAX = int(os.getenv("UPSTREAM_CONCURRENCY_MAX", 32))
+UPSTREAM_LATENCY_TARGET = float(os.getenv("UPSTREAM_LATENCY_TARGET", 3.0))
+# Render browser punya limit adaptif sendiri per host (render normal jauh lebih lama dari fetch HTTP,
+# jadi tidak boleh dihitung sebagai tanda upstream kewalahan untuk fetch biasa)
+UPSTREAM_BROWSER_LATENCY_TARGET = float(os.getenv("UPSTREAM_BROWSER_LATENCY_TARGET", 20.0))
+UPSTREAM_BACKOFF = float(os.getenv("UPSTREAM_BACKOFF", 0.7))
+UPSTREAM_QUEUE_SIZE = int(os.getenv("UPSTREAM_QUEUE_SIZE", 64))
+UPSTREAM_QUEUE_TIMEOUT = float(os.getenv("UPSTREAM_QUEUE_TIMEOUT", 10))
+
+# Ambil fragment HTMX langsung lewat HTTP sebelum fallback ke browser
+HTMX_DIRECT = os.getenv("HTMX_DIRECT", "1") == "1"
+HTMX_BASE_URL = os.getenv("HTMX_BASE_URL", BASE_URL)
+# Fragment tanpa kartu dianggap hasil kosong yang sah (tanpa fallback browser) kalau body-nya kosong,
+# memuat container listing (div.daftar), atau memuat salah satu teks penanda ini (dipisah koma)
+HTMX_EMPTY_MARKERS = tuple(m.strip() for m in os.getenv("HTMX_EMPTY_MARKERS", "").split(",") if m.strip())
+
+# /genre/<slug>/: perkiraan jumlah kartu per halaman upstream dan batas fetch paralel per request
+GENRE_PAGE_SIZE = int(os.getenv("GENRE_PAGE_SIZE", 30))
+GENRE_FANOUT_CONCURRENCY = int(os.getenv("GENRE_FANOUT_CONCURRENCY", 4))
+
+# POST /batch: maksimum item per request dan fetch paralel (dibagi semua batch yang berjalan)
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 100))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 8))
+
+# Katalog lokal (SQLite) hasil crawl /daftar-komik, dipakai /list-* kalau sudah terisi.
+# Crawler: `python catalog.py crawl|refresh|run`, atau thread scheduler di app (CATALOG_SCHEDULER=1)
+CATALOG_ENABLED = os.getenv("CATALOG_ENABLED", "1") == "1"
+CATALOG_PATH = os.getenv("CATALOG_PATH", "/tmp/mangaku-catalog.sqlite3")
+CATALOG_SCHEDULER = os.getenv("CATALOG_SCHEDULER", "0") == "1"
+CATALOG_CRAWL_CONCURRENCY = int(os.getenv("CATALOG_CRAWL_CONCURRENCY", 4))
+CATALOG_MAX_PAGES = int(os.getenv("CATALOG_MAX_PAGES", 500))
+CATALOG_CRAWL_INTERVAL = int(os.getenv("CATALOG_CRAWL_INTERVAL", 24 * 3600))
+CATALOG_REFRESH_INTERVAL = int(os.getenv("CATALOG_REFRESH_INTERVAL", 15 * 60))
+CATALOG_LATEST_PAGES = int(os.getenv("CATALOG_LATEST_PAGES", 5))
+
+# /search: index lokal (dari katalog + halaman detail) dulu, upstream hanya kalau tidak ada hasil
+# atau ?source=upstream
+SEARCH_LOCAL = os.getenv("SEARCH_LOCAL", "1") == "1"
+SEARCH_LOCAL_LIMIT = int(os.getenv("SEARCH_LOCAL_LIMIT", 30))
+SEARCH_RELOAD_INTERVAL = int(os.getenv("SEARCH_RELOAD_INTERVAL", 60))
+
+# Proxy gambar /img?u=<url>[&w=<lebar>][&fmt=webp|jpeg|png]: cache disk (LRU per total byte),
+# URL gambar chapter dan thumbnail di respons ditulis ulang ke proxy kalau aktif.
+# Resize/konversi butuh Pillow; tanpa Pillow gambar asli yang dikirim.
+IMAGE_PROXY = os.getenv("IMAGE_PROXY", "0") == "1"
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "/tmp/mangaku-images")
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", 20 * 1024 ** 2))
+IMAGE_HOSTS = tuple(h.strip() for h in os.getenv("IMAGE_HOSTS", "komiku.org").split(",") if h.strip())
+IMAGE_MAX_WIDTH = int(os.getenv("IMAGE_MAX_WIDTH", 1600))
+IMAGE_THUMB_WIDTH = int(os.getenv("IMAGE_THUMB_WIDTH", 0))
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", 80))
+IMAGE_MAX_AGE = int(os.getenv("IMAGE_MAX_AGE", 30 * 86400))
+
+# Prefetch N chapter berikutnya (urutan dari daftar chapter detail) setelah isi chapter dilayani, 0 = mati.
+# Antrian global dibatasi dan di-dedupe; worker hanya jalan selama request live < PREFETCH_MAX_LIVE.
+# PREFETCH_IMAGES: ikut hangatkan N gambar pertama tiap chapter ke cache disk (butuh IMAGE_PROXY=1)
+PREFETCH_CHAPTERS = int(os.getenv("PREFETCH_CHAPTERS", 0))
+PREFETCH_IMAGES = int(os.getenv("PREFETCH_IMAGES", 0))
+PREFETCH_QUEUE_SIZE = int(os.getenv("PREFETCH_QUEUE_SIZE", 256))
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", 2))
+PREFETCH_MAX_LIVE = int(os.getenv("PREFETCH_MAX_LIVE", 4))
+# /latest* dan /popular* dengan ?page / ?cursor: N halaman upstream setelah window yang dibaca ikut dimuat
+PREFETCH_LISTING_PAGES = int(os.getenv("PREFETCH_LISTING_PAGES", 1))
+
+# Paginasi /latest* dan /popular* (?page=N&limit=M atau ?cursor=...): limit default dan maksimum per respons
+PAGINATION_DEFAULT_LIMIT = int(os.getenv("PAGINATION_DEFAULT_LIMIT", 30))
+PAGINATION_MAX_LIMIT = int(os.getenv("PAGINATION_MAX_LIMIT", 100))
+
+# Snapshot HTML upstream: setiap versi berbeda per URL disimpan terkompresi (zstd kalau modul zstandard
+# terpasang, selain itu zlib) di SNAPSHOT_DIR, maksimal SNAPSHOT_KEEP versi per URL. SNAPSHOT_DIR="" = tidak
+# disimpan. Hasil parse terakhir per URL diingat (SNAPSHOT_MEMO_SIZE entri): HTML identik tidak di-parse ulang.
+# Total snapshot di disk dibatasi SNAPSHOT_MAX_BYTES (versi yang paling lama tidak terlihat dibuang dulu);
+# penyimpanan berjalan di thread background, antrian lebih dari SNAPSHOT_QUEUE_SIZE = snapshot dilewati.
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "/tmp/mangaku-snapshots")
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", 10))
+SNAPSHOT_MAX_BYTES = int(os.getenv("SNAPSHOT_MAX_BYTES", 256 * 1024 ** 2))
+SNAPSHOT_QUEUE_SIZE = int(os.getenv("SNAPSHOT_QUEUE_SIZE", 64))
+SNAPSHOT_MEMO_SIZE = int(os.getenv("SNAPSHOT_MEMO_SIZE", 512))
+
+# Kompresi respons (gzip, atau brotli kalau modul brotli terpasang dan diminta klien) untuk body
+# COMPRESS_TYPES minimal COMPRESS_MIN_BYTES. Hasil kompresi body yang sama diingat sampai COMPRESS_CACHE_BYTES.
+COMPRESS_ENABLED = os.getenv("COMPRESS_ENABLED", "1") == "1"
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 1024))
+COMPRESS_TYPES = frozenset(t.strip() for t in os.getenv(
+    "COMPRESS_TYPES", "application/json,text/plain").split(",") if t.strip())
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", 6))
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", 5))
+COMPRESS_CACHE_BYTES = int(os.getenv("COMPRESS_CACHE_BYTES", 16 * 1024 * 1024))
+
+# Parser HTML: "auto" (lxml kalau terpasang), "lxml" atau "html.parser"
+PARSER_BACKEND = os.getenv("PARSER_BACKEND", "auto")
+
+# Cache respons: L1 in-process (dibatasi byte) + backend bersama opsional ("sqlite").
+# Dengan SERVER_WORKERS > 1 default-nya backend sqlite di SHARED_DIR (dibaca lewat mmap, halaman yang sama
+# dipakai semua worker) dan L1 per worker lebih kecil, cukup untuk key yang paling panas.
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "1") == "1"
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", (64 if SERVER_WORKERS <= 1 else 16) * 1024 * 1024))
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite" if SERVER_WORKERS > 1 else "")
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH", os.path.join(SHARED_DIR, "mangaku-cache.sqlite3"))
+CACHE_SQLITE_MMAP = int(os.getenv("CACHE_SQLITE_MMAP", 256 * 1024 * 1024))
+CACHE_STALE_TTL = int(os.getenv("CACHE_STALE_TTL", 3600))
+CACHE_REFRESH_WORKERS = int(os.getenv("CACHE_REFRESH_WORKERS", 4))
+
+# TTL (detik) per endpoint
+CACHE_TTL = {
+    "genres": int(os.getenv("CACHE_TTL_GENRES", 6 * 3600)),
+    "list": int(os.getenv("CACHE_TTL_LIST", 30 * 60)),
+    "detail": int(os.getenv("CACHE_TTL_DETAIL", 5 * 60)),
+    "chapter": int(os.getenv("CACHE_TTL_CHAPTER", 3 * 86400)),
+    "genre": int(os.getenv("CACHE_TTL_GENRE", 10 * 60)),
+    "search": int(os.getenv("CACHE_TTL_SEARCH", 10 * 60)),
+    "latest": int(os.getenv("CACHE_TTL_LATEST", 90)),
+    "popular": int(os.getenv("CACHE_TTL_POPULAR", 10 * 60)),
+}
+
 HEADERS = {
     "User-Agent": USER_AGENT,
     "Referer": f"{BASE_URL}/pustaka/",
     "HX-Request": "true",
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
     "Accept-Language": "en-US,en;q=0.9,id;q=0.8"
+}
+
+# Request gambar ke origin: Referer situs supaya tidak ditolak sebagai hotlink
+IMAGE_HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Referer": f"{BASE_URL}/",
+    "Accept": "image/avif,image/webp,image/*,*/*;q=0.8"
 }
\ No newline at end of file
@@ -0,0 +1,40 @@
+import hashlib
+
+# Delta daftar chapter untuk /manga/<slug>/?since=<chapter_slug> dan ETag per judul.
+# Daftar chapter dari #Daftar_Chapter urut terbaru dulu.
+
+
+def chapter_slug(value):
+    # "http://.../manga/one-piece/chapter-1100/" atau "chapter-1100" -> "chapter-1100"
+    return (value or "").strip().strip("/").split("/")[-1]
+
+
+def etag(chapters):
+    """ETag lemah dari identitas chapter (url), tidak berubah selama tidak ada chapter baru/hilang."""
+    digest = hashlib.sha1("\n".join(c["url"] for c in chapters).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(header, tag):
+    # If-None-Match boleh berisi beberapa tag atau "*"; perbandingan lemah (abaikan W/)
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    wanted = tag[2:] if tag.startswith("W/") else tag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+def since(chapters, marker):
+    """Chapter yang lebih baru dari `marker`: (chapters, found). Kalau marker tidak ada, semua chapter."""
+    marker = chapter_slug(marker)
+    for i, chapter in enumerate(chapters):
+        if chapter_slug(chapter["url"]) == marker:
+            return chapters[:i], True
+    return chapters, False
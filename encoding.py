@@ -0,0 +1,188 @@
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import metrics
+from config import (
+    COMPRESS_ENABLED,
+    COMPRESS_MIN_BYTES,
+    COMPRESS_TYPES,
+    COMPRESS_GZIP_LEVEL,
+    COMPRESS_BROTLI_QUALITY,
+    COMPRESS_CACHE_BYTES,
+)
+
+try:
+    import orjson
+except ImportError:
+    # tanpa orjson: json dari stdlib (lebih lambat, hasil sama)
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    # tanpa brotli: hanya gzip
+    brotli = None
+
+# Bentuk body respons: JSON cepat (orjson kalau terpasang), projection ?fields=
+# dan kompresi gzip/brotli sesuai Accept-Encoding.
+
+
+# --- JSON ---
+def dumps(obj, sort_keys=False, default=None):
+    """JSON ringkas tanpa escape non-ASCII (sama dengan json.dumps(ensure_ascii=False, separators=(",", ":")))."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(obj, default=default, option=option).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=sort_keys, default=default)
+
+
+def loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+# --- PROJECTION ?fields= ---
+def parse_fields(value):
+    """?fields=title,chapters.title -> {"title": None, "chapters": {"title": None}}, None kalau tidak diminta.
+
+    None di sebuah key berarti isinya dikirim utuh ("chapters" mengalahkan "chapters.title").
+    """
+    tree = {}
+    for path in (value or "").split(","):
+        names = [n.strip() for n in path.split(".")]
+        if not all(names):
+            continue
+        node = tree
+        for name in names[:-1]:
+            if name in node and node[name] is None:
+                break
+            node = node.setdefault(name, {})
+        else:
+            node[names[-1]] = None
+    return tree or None
+
+
+def project(body, fields):
+    """Hanya key yang disebut di `fields` (hasil parse_fields) yang dipertahankan.
+
+    List diproyeksikan per item; key lain, termasuk yang berisi list, tidak ikut.
+    """
+    if not fields:
+        return body
+    if isinstance(body, list):
+        return [project(item, fields) for item in body]
+    if isinstance(body, dict):
+        return {k: project(v, fields[k]) for k, v in body.items() if k in fields}
+    return body
+
+
+# --- KOMPRESI ---
+def negotiate(accept_encoding):
+    """"br" / "gzip" / None dari header Accept-Encoding.
+
+    q=0 berarti ditolak, juga saat coding itu sebenarnya tercakup "*":
+    >>> negotiate("gzip;q=0, br;q=0, *") is None
+    True
+    >>> negotiate("gzip;q=0, *") != "gzip"
+    True
+    """
+    if not COMPRESS_ENABLED or not accept_encoding:
+        return None
+    accepted, refused = set(), set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        coding, q = coding.strip(), params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    refused.add(coding)
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding)
+    wildcard = "*" in accepted
+    for coding in (("br",) if brotli is not None else ()) + ("gzip",):
+        if coding in accepted or (wildcard and coding not in refused):
+            return coding
+    return None
+
+
+def compressible(mimetype, size):
+    return COMPRESS_ENABLED and mimetype in COMPRESS_TYPES and size >= COMPRESS_MIN_BYTES
+
+
+class _CompressedCache:
+    """LRU (body, coding) -> hasil kompresi, dibatasi total byte hasil kompresi.
+
+    Key = sha1 body, bukan ETag: ETag detail sama untuk varian ?since= yang isinya berbeda.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old)
+            self._data[key] = value
+            self.bytes += len(value)
+            while self.bytes > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self.bytes -= len(evicted)
+
+
+_compressed = _CompressedCache(COMPRESS_CACHE_BYTES)
+_lock = threading.Lock()
+_stats = {"responses": 0, "cached": 0, "bytes_in": 0, "bytes_out": 0}
+
+
+def compress(data, coding):
+    key = (hashlib.sha1(data).digest(), coding)
+    result = _compressed.get(key)
+    cached = result is not None
+    if not cached:
+        with metrics.phase("compress"):
+            if coding == "br":
+                result = brotli.compress(data, quality=COMPRESS_BROTLI_QUALITY)
+            else:
+                result = gzip.compress(data, COMPRESS_GZIP_LEVEL, mtime=0)
+        _compressed.set(key, result)
+    with _lock:
+        _stats["responses"] += 1
+        _stats["cached"] += cached
+        _stats["bytes_in"] += len(data)
+        _stats["bytes_out"] += len(result)
+    return result
+
+
+def stats():
+    with _lock:
+        result = dict(_stats)
+    result["json"] = "orjson" if orjson is not None else "json"
+    result["codings"] = ["br", "gzip"] if brotli is not None else ["gzip"]
+    result["cache_bytes"] = _compressed.bytes
+    return result
+
+
+@metrics.registry.collector
+def _collect():
+    s = stats()
+    yield "mangaku_compressed_responses_total", "counter", "Respons yang dikompresi (cached = hasil kompresi dipakai ulang)", [
+        ({"result": "compressed"}, s["responses"] - s["cached"]), ({"result": "cached"}, s["cached"])]
+    yield "mangaku_compression_bytes_total", "counter", "Byte body sebelum/sesudah kompresi", [
+        ({"stage": "in"}, s["bytes_in"]), ({"stage": "out"}, s["bytes_out"])]
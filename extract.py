@@ -0,0 +1,159 @@
+import images
+import metrics
+import parsers
+from config import API_BASE
+
+
+class Schema:
+    """Skema deklaratif: CardSpec (elemen apa yang diambil) + daftar field output.
+
+    Setiap field adalah (nama, fungsi(el, row)), dihitung berurutan sehingga
+    field boleh memakai field sebelumnya (mis. genre membuang teks type).
+    Kartu yang salah satu elemen `required`-nya tidak ada dilewati.
+    """
+
+    def __init__(self, spec, fields, required=()):
+        self.spec = spec
+        self.fields = tuple(fields)
+        self.required = tuple(required)
+
+    def extract_card(self, el):
+        row = {}
+        for name, get in self.fields:
+            row[name] = get(el, row)
+        return row
+
+    def iter_extract(self, html):
+        for el in self.spec.cards(html):
+            if any(el[key] is None for key in self.required):
+                continue
+            yield self.extract_card(el)
+
+    @metrics.timed("parse")
+    def extract(self, html):
+        return list(self.iter_extract(html))
+
+
+# --- FIELD ---
+def text(key):
+    def get(el, row):
+        tag = el[key]
+        return tag.get_text(strip=True) if tag is not None else ""
+    return get
+
+
+def attr(key, name):
+    def get(el, row):
+        tag = el[key]
+        return tag.get(name) if tag is not None else None
+    return get
+
+
+def thumbnail(key, name):
+    # lewat proxy gambar kalau IMAGE_PROXY aktif
+    get_attr = attr(key, name)
+
+    def get(el, row):
+        return images.thumbnail_url(get_attr(el, row))
+    return get
+
+
+def slug_of(href):
+    # https://komiku.org/manga/one-piece/ → one-piece
+    return (href or "").strip().strip("/").split("/")[-1]
+
+
+def manga_link(key):
+    def get(el, row):
+        return f"{API_BASE}/manga/{slug_of(el[key].get('href'))}/"
+    return get
+
+
+def chapter_link(index):
+    # /one-piece-chapter-1100/ → {API_BASE}/manga/one-piece/chapter-1100/
+    def get(el, row):
+        links = el["new_links"]
+        if not links:
+            return None
+        slug = slug_of(el["link"].get("href"))
+        frag = slug_of(links[index].get("href"))
+        prefix = f"{slug}-"
+        chapter = frag[len(prefix):] if frag.startswith(prefix) else frag
+        return f"{API_BASE}/manga/{slug}/{chapter}/" if chapter else None
+    return get
+
+
+def genre_text(el, row):
+    tag = el["genre"]
+    return tag.get_text(strip=True).replace(row["type"], "").strip() if tag is not None else ""
+
+
+def _info_parts(el):
+    tag = el["info"]
+    teks = tag.get_text(strip=True) if tag is not None else ""
+    head, sep, tail = teks.partition("|")
+    return head, tail if sep else ""
+
+
+def readers(el, row):
+    if el["readers"] is not None:
+        return el["readers"].get_text(strip=True)
+    return _info_parts(el)[0].strip().replace("pembaca", "").strip()
+
+
+def updated(el, row):
+    return _info_parts(el)[1].split("|")[0].strip()
+
+
+def ls4_genres(el, row):
+    genres = []
+    for g in el["genres"]:
+        teks = g.text.replace('Genre : ', '').strip()
+        genres.extend([x.strip() for x in teks.split(',') if x.strip()])
+    return genres
+
+
+# --- SKEMA ---
+# Kartu div.bge lengkap: /latest*, /popular*, /genre/<slug>/
+BGE_LISTING = Schema(
+    parsers.BGE_CARD,
+    required=("title", "img", "link"),
+    fields=[
+        ("title", text("title")),
+        ("type", text("type")),
+        ("genre", genre_text),
+        ("readers", readers),
+        ("updated", updated),
+        ("description", text("description")),
+        ("thumbnail", thumbnail("img", "src")),
+        ("link", manga_link("link")),
+        ("chapter_awal", chapter_link(0)),
+        ("chapter_terbaru", chapter_link(-1)),
+    ],
+)
+
+# Hasil search memakai kartu yang sama, dengan field lebih sedikit
+BGE_SEARCH = Schema(
+    parsers.BGE_CARD,
+    required=("title", "img", "link"),
+    fields=[
+        ("title", text("title")),
+        ("type", text("type")),
+        ("genre", genre_text),
+        ("description", text("description")),
+        ("thumbnail", thumbnail("img", "src")),
+        ("link", manga_link("link")),
+    ],
+)
+
+# Kartu div.ls4 di /daftar-komik
+LS4_LISTING = Schema(
+    parsers.LS4_CARD,
+    required=("title",),
+    fields=[
+        ("title", lambda el, row: el["title"].text.strip()),
+        ("url", manga_link("title")),
+        ("thumbnail", thumbnail("img", "data-src")),
+        ("genres", ls4_genres),
+    ],
+)
@@ -0,0 +1,134 @@
+import re
+import threading
+
+import requests
+
+import browser_pool
+import http_client
+import limiter
+import metrics
+from singleflight import flight, aflight
+from config import BASE_URL, HEADERS, HTMX_DIRECT, HTMX_BASE_URL, HTMX_EMPTY_MARKERS
+
+# fragment HTMX dianggap valid kalau memuat minimal satu kartu div.bge
+_CARD_RE = re.compile(r"""<div[^>]+class=["'][^"']*\bbge\b""")
+# container listing Komiku: ada tapi tanpa kartu = memang tidak ada hasil
+_CONTAINER_RE = re.compile(r"""<div[^>]+class=["'][^"']*\bdaftar\b""")
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _record(endpoint, path, reason=None):
+    with _stats_lock:
+        s = _stats.setdefault(endpoint, {"http": 0, "browser": 0, "empty": 0, "fallback": {}})
+        s[path] += 1
+        if reason:
+            s["fallback"][reason] = s["fallback"].get(reason, 0) + 1
+
+
+def stats():
+    with _stats_lock:
+        return {k: {"http": v["http"], "browser": v["browser"], "empty": v["empty"], "fallback": dict(v["fallback"])}
+                for k, v in _stats.items()}
+
+
+def _fragment_state(html):
+    """"cards", "empty" (fragment utuh tanpa hasil) atau None (rusak/asing: fallback ke browser)."""
+    if _CARD_RE.search(html):
+        return "cards"
+    if not html.strip() or _CONTAINER_RE.search(html) or any(m in html for m in HTMX_EMPTY_MARKERS):
+        return "empty"
+    return None
+
+
+def get_dynamic_html(url: str) -> str:
+    return browser_pool.pool.render(url, "div.bge")
+
+
+def fragment_url(url: str) -> str:
+    if HTMX_BASE_URL and BASE_URL and url.startswith(BASE_URL):
+        return HTMX_BASE_URL + url[len(BASE_URL):]
+    return url
+
+
+async def aget_dynamic_html(url: str) -> str:
+    return await browser_pool.pool.render_async(url, "div.bge")
+
+
+def _fragment_headers(url):
+    headers = dict(HEADERS)
+    headers["HX-Current-URL"] = url
+    return headers
+
+
+def get_fragment_html(url: str) -> str:
+    return http_client.get_text(fragment_url(url), headers=_fragment_headers(url))
+
+
+async def aget_fragment_html(url: str) -> str:
+    return await http_client.aget_text(fragment_url(url), headers=_fragment_headers(url))
+
+
+def fetch_listing(endpoint: str, url: str) -> str:
+    return flight.do("listing", url, lambda: _fetch_listing(endpoint, url))
+
+
+def _fetch_listing(endpoint, url):
+    # Coba ambil fragment HTMX lewat HTTP biasa dulu, browser hanya cadangan
+    if HTMX_DIRECT:
+        try:
+            html = get_fragment_html(url)
+            state = _fragment_state(html)
+            if state is not None:
+                _record(endpoint, "http" if state == "cards" else "empty")
+                return html
+            reason = "no_cards"
+        except requests.RequestException as e:
+            reason = type(e).__name__
+        html = get_dynamic_html(url)
+        _record(endpoint, "browser", reason)
+        return html
+
+    html = get_dynamic_html(url)
+    _record(endpoint, "browser")
+    return html
+
+
+async def afetch_listing(endpoint: str, url: str) -> str:
+    return await aflight.do("listing", url, lambda: _afetch_listing(endpoint, url))
+
+
+async def _afetch_listing(endpoint, url):
+    if HTMX_DIRECT:
+        try:
+            html = await aget_fragment_html(url)
+            state = _fragment_state(html)
+            if state is not None:
+                _record(endpoint, "http" if state == "cards" else "empty")
+                return html
+            reason = "no_cards"
+        except limiter.Overloaded:
+            # upstream sedang dibatasi: browser ke host yang sama hanya menambah beban
+            raise
+        except Exception as e:
+            reason = type(e).__name__
+        html = await aget_dynamic_html(url)
+        _record(endpoint, "browser", reason)
+        return html
+
+    html = await aget_dynamic_html(url)
+    _record(endpoint, "browser")
+    return html
+
+
+@metrics.registry.collector
+def _collect():
+    paths, fallbacks = [], []
+    for endpoint, s in stats().items():
+        for path in ("http", "empty", "browser"):
+            paths.append(({"endpoint": endpoint, "path": path}, s[path]))
+        for reason, n in s["fallback"].items():
+            fallbacks.append(({"endpoint": endpoint, "reason": reason}, n))
+    yield "mangaku_listing_fetch_total", "counter", "Fetch listing per jalur (fragment HTTP, fragment kosong, browser)", paths
+    yield "mangaku_listing_fallback_total", "counter", "Fallback ke browser per alasan", fallbacks
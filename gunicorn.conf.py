@@ -0,0 +1,35 @@
+# Konfigurasi gunicorn untuk mode multi-proses (dipakai serve.py, atau langsung):
+#   gunicorn -c gunicorn.conf.py app:app                    -> Flask, worker gthread
+#   SERVER_MODE=asgi gunicorn -c gunicorn.conf.py asgi:app  -> Quart, worker uvicorn
+#
+# App di-import sekali di master (preload) lalu worker di-fork darinya. Modul yang
+# memegang koneksi/thread (SQLite, browser pool, scheduler) membukanya ulang per pid.
+#
+# Reload tanpa putus:
+#   kill -HUP <master>    konfigurasi dibaca ulang, worker diganti bertahap (request berjalan diselesaikan)
+#   kill -USR2 <master>   master baru dengan kode baru; setelah sehat: kill -QUIT <master lama>
+# Karena preload, HUP tidak memuat ulang kode aplikasi; pakai USR2 untuk deploy.
+import os
+
+from config import (
+    SERVER_MODE,
+    SERVER_HOST,
+    SERVER_WORKERS,
+    SERVER_THREADS,
+    SERVER_TIMEOUT,
+    SERVER_GRACEFUL_TIMEOUT,
+    SERVER_MAX_REQUESTS,
+)
+
+bind = f"{SERVER_HOST}:{os.environ.get('PORT', 8000)}"
+workers = max(1, SERVER_WORKERS)
+worker_class = "uvicorn.workers.UvicornWorker" if SERVER_MODE == "asgi" else "gthread"
+threads = max(1, SERVER_THREADS)
+preload_app = True
+timeout = SERVER_TIMEOUT
+graceful_timeout = SERVER_GRACEFUL_TIMEOUT
+max_requests = SERVER_MAX_REQUESTS
+max_requests_jitter = SERVER_MAX_REQUESTS // 10
+# di belakang reverse proxy: percaya X-Forwarded-* dari mana saja (sama dengan proxy_headers uvicorn)
+forwarded_allow_ips = "*"
+accesslog = "-"
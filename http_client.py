@@ -0,0 +1,200 @@
+import asyncio
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import limiter
+import metrics
+from singleflight import flight, aflight
+from config import (
+    HEADERS,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    HTTP_RETRIES,
+    HTTP_BACKOFF,
+    HTTP_BACKOFF_JITTER,
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+)
+
+DEFAULT_TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _retry():
+    # urllib3 hanya mengulang koneksi yang gagal dibuka (request belum sampai ke upstream).
+    # Read error dan 429/5xx diulang di _get_retry, satu slot limiter per percobaan, supaya
+    # setiap respons gagal sampai ke limit adaptif dan backoff tidak memegang slot.
+    kwargs = dict(
+        total=HTTP_RETRIES,
+        connect=HTTP_RETRIES,
+        read=False,
+        status=0,
+        backoff_factor=HTTP_BACKOFF,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    try:
+        return Retry(backoff_jitter=HTTP_BACKOFF_JITTER, **kwargs)
+    except TypeError:
+        # urllib3 < 2 belum punya backoff_jitter
+        return Retry(**kwargs)
+
+
+# Satu adapter (dan connection pool urllib3-nya) dipakai semua thread.
+# Session dibuat per thread karena cookie jar Session tidak thread-safe.
+_adapter = HTTPAdapter(
+    pool_connections=HTTP_POOL_CONNECTIONS,
+    pool_maxsize=HTTP_POOL_MAXSIZE,
+    max_retries=_retry(),
+)
+_local = threading.local()
+
+
+def session() -> requests.Session:
+    s = getattr(_local, "session", None)
+    if s is None:
+        s = requests.Session()
+        s.mount("http://", _adapter)
+        s.mount("https://", _adapter)
+        _local.session = s
+    return s
+
+
+def get(url: str, headers=None, timeout=DEFAULT_TIMEOUT, **kwargs) -> requests.Response:
+    return session().get(url, headers=HEADERS if headers is None else headers, timeout=timeout, **kwargs)
+
+
+def _get_retry(url, headers):
+    for attempt in range(HTTP_RETRIES + 1):
+        retry_after = None
+        try:
+            # slot limiter per percobaan: backoff di bawah tidak memegang slot
+            with limiter.slot(url) as slot:
+                resp = get(url, headers=headers)
+                slot.status = resp.status_code
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt >= HTTP_RETRIES:
+                raise
+        else:
+            if resp.status_code not in RETRY_STATUSES or attempt >= HTTP_RETRIES:
+                resp.raise_for_status()
+                return resp
+            retry_after = resp.headers.get("Retry-After")
+        time.sleep(_backoff(attempt, retry_after))
+
+
+def _get_text(url, headers):
+    try:
+        with metrics.phase("upstream"):
+            resp = _get_retry(url, headers)
+            text = resp.text
+    except requests.Timeout:
+        metrics.upstream_error("timeout")
+        raise
+    except requests.ConnectionError:
+        metrics.upstream_error("connection")
+        raise
+    except requests.HTTPError:
+        metrics.upstream_error("status")
+        raise
+    # elapsed requests = kirim request sampai header respons diterima (TTFB)
+    metrics.record("upstream_ttfb", resp.elapsed.total_seconds())
+    return text
+
+
+def get_text(url: str, headers=None) -> str:
+    # request identik yang sedang berjalan cukup dikirim sekali ke upstream
+    headers = HEADERS if headers is None else headers
+    key = (url, tuple(sorted(headers.items())))
+    return flight.do("http", key, lambda: _get_text(url, headers))
+
+
+# --- CLIENT ASYNC (mode ASGI) ---
+# httpx hanya di-import saat mode async dipakai. Satu AsyncClient per event loop.
+_async_clients = {}
+
+
+def _async_client():
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=HTTP_POOL_CONNECTIONS * HTTP_POOL_MAXSIZE,
+                max_keepalive_connections=HTTP_POOL_MAXSIZE,
+            ),
+            follow_redirects=True,
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def astream(url: str, headers=None, **kwargs):
+    # async context manager respons streaming (body besar, mis. gambar di images.py)
+    return _async_client().stream("GET", url, headers=HEADERS if headers is None else headers, **kwargs)
+
+
+async def aclose():
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def _backoff(attempt, retry_after=None):
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    return HTTP_BACKOFF * (2 ** attempt) + random.uniform(0, HTTP_BACKOFF_JITTER)
+
+
+async def _aget_text(url, headers):
+    import httpx
+
+    try:
+        with metrics.phase("upstream"):
+            return await _aget_text_retry(url, headers)
+    except httpx.TimeoutException:
+        metrics.upstream_error("timeout")
+        raise
+    except httpx.TransportError:
+        metrics.upstream_error("connection")
+        raise
+    except httpx.HTTPStatusError:
+        metrics.upstream_error("status")
+        raise
+
+
+async def _aget_text_retry(url, headers):
+    import httpx
+
+    client = _async_client()
+    for attempt in range(HTTP_RETRIES + 1):
+        retry_after = None
+        try:
+            # slot limiter per percobaan: backoff di bawah tidak memegang slot
+            async with limiter.aslot(url) as slot:
+                resp = await client.get(url, headers=headers)
+                slot.status = resp.status_code
+        except httpx.TransportError:
+            if attempt >= HTTP_RETRIES:
+                raise
+        else:
+            if resp.status_code not in RETRY_STATUSES or attempt >= HTTP_RETRIES:
+                resp.raise_for_status()
+                return resp.text
+            retry_after = resp.headers.get("Retry-After")
+        await asyncio.sleep(_backoff(attempt, retry_after))
+
+
+async def aget_text(url: str, headers=None) -> str:
+    headers = HEADERS if headers is None else headers
+    key = (url, tuple(sorted(headers.items())))
+    return await aflight.do("http", key, lambda: _aget_text(url, headers))
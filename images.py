@@ -0,0 +1,426 @@
+import asyncio
+import hashlib
+import io
+import logging
+import mimetypes
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import suppress
+from urllib.parse import parse_qs, urlencode, urljoin, urlsplit
+
+import requests
+
+import http_client
+import limiter
+import metrics
+from singleflight import flight, aflight
+from config import (
+    API_BASE,
+    IMAGE_PROXY,
+    IMAGE_CACHE_DIR,
+    IMAGE_CACHE_MAX_BYTES,
+    IMAGE_MAX_BYTES,
+    IMAGE_HOSTS,
+    IMAGE_MAX_WIDTH,
+    IMAGE_THUMB_WIDTH,
+    IMAGE_QUALITY,
+    IMAGE_HEADERS,
+)
+
+try:
+    from PIL import Image
+except ImportError:
+    # tanpa Pillow: w/fmt diabaikan, gambar asli yang dikirim
+    Image = None
+
+log = logging.getLogger(__name__)
+
+PROXY_PATH = f"{API_BASE}/img"
+FORMATS = {"webp": "image/webp", "jpeg": "image/jpeg", "png": "image/png"}
+WIDTH_STEP = 50       # lebar dibulatkan ke atas supaya varian di disk tidak meledak
+CHUNK = 64 * 1024
+
+
+class ImageError(ValueError):
+    # request tidak valid (host tidak diizinkan, format tidak dikenal) -> 400
+    pass
+
+
+class OriginError(RuntimeError):
+    # origin mengirim sesuatu yang bukan gambar / terlalu besar -> 502
+    pass
+
+
+# --- URL ---
+def allowed(url):
+    parts = urlsplit(url or "")
+    host = parts.hostname or ""
+    return parts.scheme in ("http", "https") and any(host == h or host.endswith("." + h) for h in IMAGE_HOSTS)
+
+
+def proxy_url(url, width=0):
+    """URL origin -> URL /img milik API ini. URL dari host di luar IMAGE_HOSTS tidak diubah."""
+    if not IMAGE_PROXY or not url or url.startswith(PROXY_PATH) or not allowed(url):
+        return url
+    query = {"u": url, "w": width} if width else {"u": url}
+    return f"{PROXY_PATH}?{urlencode(query)}"
+
+
+def thumbnail_url(url):
+    return proxy_url(url, IMAGE_THUMB_WIDTH)
+
+
+def origin_url(url):
+    # kebalikan proxy_url: katalog selalu menyimpan URL origin
+    if url and url.startswith(PROXY_PATH + "?"):
+        return parse_qs(urlsplit(url).query).get("u", [url])[0]
+    return url
+
+
+def variant(width=None, fmt=None):
+    """Normalisasi (lebar, format) varian; (0, "") = gambar asli."""
+    fmt = (fmt or "").lower().replace("jpg", "jpeg")
+    if fmt and fmt not in FORMATS:
+        raise ImageError(f"format tidak didukung: {fmt} (pilih {', '.join(FORMATS)})")
+    if Image is None:
+        return 0, ""
+    width = max(0, int(width or 0))
+    if width:
+        width = min(IMAGE_MAX_WIDTH, -(-width // WIDTH_STEP) * WIDTH_STEP)
+    return width, fmt
+
+
+def _key(url, width, fmt):
+    return f"{url}#w={width}&fmt={fmt}" if width or fmt else url
+
+
+def _mimetype(url, content_type):
+    mime = (content_type or "").split(";")[0].strip().lower()
+    if not mime or mime == "application/octet-stream":
+        mime = mimetypes.guess_type(urlsplit(url).path)[0] or ""
+    if not mime.startswith("image/"):
+        raise OriginError(f"origin tidak mengirim gambar ({content_type})")
+    return mime
+
+
+# --- CACHE DISK ---
+class ImageStore:
+    """Cache gambar di disk: file dinamai sha256 isinya, index key -> file di SQLite.
+
+    Dibatasi total byte; yang paling lama tidak diakses dibuang lebih dulu (LRU).
+    File sama (URL berbeda, isi sama) hanya disimpan sekali.
+    """
+
+    EVICT_EVERY = 20
+    TOUCH_INTERVAL = 60
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(root, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS images ("
+            " key TEXT PRIMARY KEY, digest TEXT NOT NULL, size INTEGER NOT NULL,"
+            " mime TEXT NOT NULL, accessed REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS images_accessed ON images (accessed)")
+        conn.execute("CREATE INDEX IF NOT EXISTS images_digest ON images (digest)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(os.path.join(self.root, "index.sqlite3"), timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def file(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def get(self, key):
+        """(path, mimetype, digest) atau None."""
+        conn = self._conn()
+        row = conn.execute("SELECT digest, mime, accessed FROM images WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        digest, mime, accessed = row
+        path = self.file(digest)
+        if not os.path.exists(path):
+            conn.execute("DELETE FROM images WHERE key = ?", (key,))
+            return None
+        now = time.time()
+        if now - accessed > self.TOUCH_INTERVAL:
+            conn.execute("UPDATE images SET accessed = ? WHERE key = ?", (now, key))
+        return path, mime, digest
+
+    def put(self, key, tmp_path, digest, mime):
+        # tmp_path harus di self.root supaya os.replace atomik (satu filesystem)
+        path = self.file(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        self._conn().execute(
+            "INSERT OR REPLACE INTO images (key, digest, size, mime, accessed) VALUES (?, ?, ?, ?, ?)",
+            (key, digest, os.path.getsize(path), mime, time.time()),
+        )
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            try:
+                self.evict()
+            except (OSError, sqlite3.Error) as e:
+                log.warning("image cache eviction failed: %s", e)
+        return path, mime, digest
+
+    def put_bytes(self, key, data, mime):
+        spool = Spool(self.root)
+        spool.write(data)
+        return spool.commit(self, key, mime)
+
+    def size(self):
+        row = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM"
+            " (SELECT digest, MAX(size) AS size FROM images GROUP BY digest)"
+        ).fetchone()
+        return row[0], row[1]
+
+    def evict(self):
+        _, total = self.size()
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        conn = self._conn()
+        rows = conn.execute("SELECT key, digest, size FROM images ORDER BY accessed").fetchall()
+        for key, digest, size in rows:
+            conn.execute("DELETE FROM images WHERE key = ?", (key,))
+            if conn.execute("SELECT 1 FROM images WHERE digest = ? LIMIT 1", (digest,)).fetchone() is None:
+                with suppress(FileNotFoundError):
+                    os.remove(self.file(digest))
+                total -= size
+            if total <= target:
+                break
+
+    def stats(self):
+        files, size = self.size()
+        return {"files": files, "bytes": size, "max_bytes": self.max_bytes}
+
+
+class Spool:
+    """File sementara + sha256 isinya selama download, dipindah ke store setelah lengkap."""
+
+    def __init__(self, root):
+        fd, self.path = tempfile.mkstemp(dir=root, suffix=".part")
+        self.file = os.fdopen(fd, "wb")
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, chunk):
+        self.size += len(chunk)
+        if self.size > IMAGE_MAX_BYTES:
+            raise OriginError(f"gambar lebih dari {IMAGE_MAX_BYTES} byte")
+        self.hash.update(chunk)
+        self.file.write(chunk)
+
+    def commit(self, store, key, mime):
+        self.file.close()
+        return store.put(key, self.path, self.hash.hexdigest(), mime)
+
+    def discard(self):
+        self.file.close()
+        with suppress(FileNotFoundError):
+            os.remove(self.path)
+
+
+store = ImageStore(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES) if IMAGE_PROXY else None
+
+_stats = {"hit": 0, "miss": 0, "fetch": 0, "fetch_bytes": 0, "resize": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name, value=1):
+    with _stats_lock:
+        _stats[name] += value
+
+
+def stats():
+    with _stats_lock:
+        result = dict(_stats)
+    result["store"] = store.stats() if store is not None else None
+    return result
+
+
+# --- RESIZE / KONVERSI (Pillow) ---
+@metrics.timed("resize")
+def _resize(path, width, fmt):
+    with Image.open(path) as im:
+        fmt = fmt or (im.format or "").lower()
+        if fmt not in FORMATS:
+            fmt = "png"
+        if width and im.width > width:
+            im = im.resize((width, max(1, round(im.height * width / im.width))), Image.LANCZOS)
+        if fmt == "jpeg" and im.mode not in ("RGB", "L"):
+            im = im.convert("RGB")
+        buf = io.BytesIO()
+        im.save(buf, fmt.upper(), quality=IMAGE_QUALITY)
+    _count("resize")
+    return buf.getvalue(), FORMATS[fmt]
+
+
+def _check(url):
+    if store is None:
+        raise ImageError("proxy gambar tidak aktif (IMAGE_PROXY=1)")
+    if not allowed(url):
+        raise ImageError(f"host gambar tidak diizinkan: {urlsplit(url or '').hostname}")
+
+
+# Redirect diikuti manual: setiap hop harus ke host IMAGE_HOSTS juga, supaya origin yang diizinkan
+# tidak bisa mengarahkan proxy ke alamat internal.
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+
+def _redirect(url, status, location):
+    """URL tujuan redirect (sudah dicek allowed), None kalau respons bukan redirect."""
+    if status not in REDIRECT_STATUSES or not location:
+        return None
+    target = urljoin(url, location)
+    if not allowed(target):
+        raise ImageError(f"redirect ke host gambar yang tidak diizinkan: {urlsplit(target).hostname}")
+    return target
+
+
+# --- VERSI SYNC ---
+def _open(url):
+    for _ in range(MAX_REDIRECTS + 1):
+        resp = http_client.get(url, headers=IMAGE_HEADERS, stream=True, allow_redirects=False)
+        try:
+            target = _redirect(url, resp.status_code, resp.headers.get("Location"))
+        except ImageError:
+            resp.close()
+            raise
+        if target is None:
+            return url, resp
+        resp.close()
+        url = target
+    raise ImageError("terlalu banyak redirect")
+
+
+def _download(url):
+    with limiter.slot(url) as slot, metrics.phase("upstream"):
+        try:
+            final, resp = _open(url)
+        except requests.RequestException:
+            metrics.upstream_error("image")
+            raise
+        slot.status = resp.status_code
+        spool = None
+        try:
+            if resp.status_code >= 400:
+                metrics.upstream_error("image")
+                resp.raise_for_status()
+            mime = _mimetype(final, resp.headers.get("Content-Type"))
+            spool = Spool(store.root)
+            for chunk in resp.iter_content(CHUNK):
+                spool.write(chunk)
+        except BaseException:
+            if spool is not None:
+                spool.discard()
+            raise
+        finally:
+            resp.close()
+    _count("fetch")
+    _count("fetch_bytes", spool.size)
+    return spool.commit(store, url, mime)
+
+
+def _load(url, width, fmt):
+    original = store.get(url) or _download(url)
+    if not width and not fmt:
+        return original
+    data, mime = _resize(original[0], width, fmt)
+    return store.put_bytes(_key(url, width, fmt), data, mime)
+
+
+def get(url, width=None, fmt=None):
+    """(path, mimetype, digest) gambar dari cache disk; download dari origin / resize kalau belum ada."""
+    _check(url)
+    width, fmt = variant(width, fmt)
+    key = _key(url, width, fmt)
+    found = store.get(key)
+    if found is not None:
+        _count("hit")
+        return found
+    _count("miss")
+    return flight.do("image", key, lambda: _load(url, width, fmt))
+
+
+# --- VERSI ASYNC (mode ASGI) ---
+async def _adownload(url):
+    import httpx
+
+    spool = None
+    try:
+        async with limiter.aslot(url) as slot:
+            with metrics.phase("upstream"):
+                source = url
+                for _ in range(MAX_REDIRECTS + 1):
+                    async with http_client.astream(source, IMAGE_HEADERS, follow_redirects=False) as resp:
+                        slot.status = resp.status_code
+                        target = _redirect(source, resp.status_code, resp.headers.get("Location"))
+                        if target is None:
+                            resp.raise_for_status()
+                            mime = _mimetype(source, resp.headers.get("Content-Type"))
+                            spool = Spool(store.root)
+                            async for chunk in resp.aiter_bytes(CHUNK):
+                                spool.write(chunk)
+                            break
+                    source = target
+                else:
+                    raise ImageError("terlalu banyak redirect")
+    except BaseException as e:
+        if isinstance(e, httpx.HTTPError):
+            metrics.upstream_error("image")
+        if spool is not None:
+            spool.discard()
+        raise
+    _count("fetch")
+    _count("fetch_bytes", spool.size)
+    return spool.commit(store, url, mime)
+
+
+async def _aload(url, width, fmt):
+    original = store.get(url) or await _adownload(url)
+    if not width and not fmt:
+        return original
+    data, mime = await asyncio.to_thread(_resize, original[0], width, fmt)
+    return store.put_bytes(_key(url, width, fmt), data, mime)
+
+
+async def aget(url, width=None, fmt=None):
+    _check(url)
+    width, fmt = variant(width, fmt)
+    key = _key(url, width, fmt)
+    found = store.get(key)
+    if found is not None:
+        _count("hit")
+        return found
+    _count("miss")
+    return await aflight.do("image", key, lambda: _aload(url, width, fmt))
+
+
+@metrics.registry.collector
+def _collect():
+    s = stats()
+    yield "mangaku_image_lookups_total", "counter", "Lookup proxy gambar per hasil", [
+        ({"result": "hit"}, s["hit"]), ({"result": "miss"}, s["miss"])]
+    yield "mangaku_image_fetch_bytes_total", "counter", "Byte gambar yang diunduh dari origin", [
+        ({}, s["fetch_bytes"])]
+    yield "mangaku_image_resize_total", "counter", "Varian gambar yang dibuat (resize/konversi)", [
+        ({}, s["resize"])]
+    if s["store"] is not None:
+        yield "mangaku_image_cache_bytes", "gauge", "Ukuran cache gambar di disk", [({}, s["store"]["bytes"])]
@@ -0,0 +1,326 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from urllib.parse import urlsplit
+
+import metrics
+from config import (
+    UPSTREAM_RATE,
+    UPSTREAM_BURST,
+    UPSTREAM_RATE_STORE,
+    UPSTREAM_CONCURRENCY,
+    UPSTREAM_CONCURRENCY_MIN,
+    UPSTREAM_CONCURRENCY_MAX,
+    UPSTREAM_LATENCY_TARGET,
+    UPSTREAM_BROWSER_LATENCY_TARGET,
+    UPSTREAM_BACKOFF,
+    UPSTREAM_QUEUE_SIZE,
+    UPSTREAM_QUEUE_TIMEOUT,
+)
+
+# Semua request ke upstream (HTTP sync/async, navigasi browser, unduh gambar) lewat
+# slot(url) / aslot(url): tunggu token bucket host, lalu tunggu slot konkurensi host.
+# Token bucket bisa dibagi antar proses (SQLite); batas konkurensi per proses, terpisah
+# per jenis ("http" / "browser") karena target latensinya berbeda.
+
+
+class Overloaded(RuntimeError):
+    """Upstream sedang dibatasi: antrian penuh atau waktu tunggu habis (route membalas 503)."""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# --- TOKEN BUCKET ---
+class TokenBucket:
+    """rate token/detik, maksimal burst token, per host. Token boleh minus (reservasi)."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._state = {}
+        self._lock = threading.Lock()
+
+    def _take(self, tokens, updated, now, max_wait):
+        tokens = min(self.burst, tokens + (now - updated) * self.rate) - 1
+        wait = -tokens / self.rate if tokens < 0 else 0.0
+        if wait > max_wait:
+            raise Overloaded(f"rate limit upstream: antrian {wait:.1f}s", retry_after=int(wait) + 1)
+        return tokens, wait
+
+    def reserve(self, host, max_wait):
+        """Detik yang harus ditunggu sebelum request ke host boleh jalan."""
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._state.get(host, (self.burst, now))
+            tokens, wait = self._take(tokens, updated, now, max_wait)
+            self._state[host] = (tokens, now)
+        return wait
+
+
+class SQLiteTokenBucket(TokenBucket):
+    """Bucket yang sama dipakai semua worker: state di file SQLite, update dalam transaksi."""
+
+    def __init__(self, rate, burst, path):
+        super().__init__(rate, burst)
+        self.path = path
+        self._local = threading.local()
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS buckets (host TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def reserve(self, host, max_wait):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE host = ?", (host,)).fetchone()
+            tokens, wait = self._take(*(row or (self.burst, now)), now, max_wait)
+            conn.execute("INSERT OR REPLACE INTO buckets (host, tokens, updated) VALUES (?, ?, ?)",
+                         (host, tokens, now))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+
+# --- BATAS KONKURENSI ADAPTIF (AIMD) ---
+class AdaptiveLimit:
+    """Batas request paralel ke satu host yang menyesuaikan diri.
+
+    Sukses dan cukup cepat: limit += 1/limit (kira-kira +1 per putaran penuh).
+    Error, 429/5xx atau lebih lambat dari target: limit *= backoff, paling sering
+    sekali per target latensi supaya satu ledakan error tidak menjatuhkannya ke minimum.
+    Yang tidak kebagian slot menunggu FIFO (thread maupun coroutine).
+    """
+
+    def __init__(self, initial=UPSTREAM_CONCURRENCY, minimum=UPSTREAM_CONCURRENCY_MIN,
+                 maximum=UPSTREAM_CONCURRENCY_MAX, latency_target=UPSTREAM_LATENCY_TARGET,
+                 backoff=UPSTREAM_BACKOFF, queue_size=UPSTREAM_QUEUE_SIZE):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.queue_size = queue_size
+        self.inflight = 0
+        self._waiters = deque()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"acquired": 0, "queued": 0, "rejected": 0, "timeout": 0, "increase": 0, "decrease": 0}
+
+    def _try(self):
+        # dipanggil dengan _lock
+        if not self._waiters and self.inflight < int(self.limit):
+            self.inflight += 1
+            self._stats["acquired"] += 1
+            return True
+        if len(self._waiters) >= self.queue_size:
+            self._stats["rejected"] += 1
+            raise Overloaded(f"antrian upstream penuh ({self.queue_size})")
+        self._stats["queued"] += 1
+        return False
+
+    def _grant(self):
+        # dipanggil dengan _lock: bagikan slot kosong ke penunggu paling lama
+        while self._waiters and self.inflight < int(self.limit):
+            waiter = self._waiters.popleft()
+            self.inflight += 1
+            self._stats["acquired"] += 1
+            if isinstance(waiter, threading.Event):
+                waiter.set()
+            else:
+                waiter.get_loop().call_soon_threadsafe(_resolve, waiter)
+
+    def _timeout(self, waiter):
+        # True kalau penunggu dikeluarkan dari antrian; False kalau slot sudah telanjur diberikan
+        with self._lock:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                return False
+            self._stats["timeout"] += 1
+            return True
+
+    def acquire(self, timeout):
+        with self._lock:
+            if self._try():
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        if not event.wait(max(0.0, timeout)) and self._timeout(event):
+            raise Overloaded(f"menunggu slot upstream lebih dari {timeout:.1f}s")
+
+    async def aacquire(self, timeout):
+        with self._lock:
+            if self._try():
+                return
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append(future)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), max(0.0, timeout))
+        except asyncio.TimeoutError:
+            if self._timeout(future):
+                raise Overloaded(f"menunggu slot upstream lebih dari {timeout:.1f}s")
+        except asyncio.CancelledError:
+            # klien putus: kembalikan slot kalau sudah telanjur diberikan
+            if not self._timeout(future):
+                self.release(0.0, False)
+            raise
+
+    def release(self, latency, failed):
+        with self._lock:
+            self.inflight -= 1
+            now = time.monotonic()
+            if failed or latency > self.latency_target:
+                if now - self._last_decrease >= self.latency_target:
+                    self.limit = max(self.minimum, self.limit * self.backoff)
+                    self._last_decrease = now
+                    self._stats["decrease"] += 1
+            elif self.limit < self.maximum:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                self._stats["increase"] += 1
+            self._grant()
+
+    def reject(self):
+        with self._lock:
+            self._stats["rejected"] += 1
+
+    def stats(self):
+        with self._lock:
+            result = dict(self._stats)
+            result.update(limit=round(self.limit, 2), inflight=self.inflight, waiting=len(self._waiters))
+        return result
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+_bucket = None
+if UPSTREAM_RATE > 0:
+    _bucket = SQLiteTokenBucket(UPSTREAM_RATE, UPSTREAM_BURST, UPSTREAM_RATE_STORE) if UPSTREAM_RATE_STORE \
+        else TokenBucket(UPSTREAM_RATE, UPSTREAM_BURST)
+_limits = {}
+_limits_lock = threading.Lock()
+
+
+# target latensi per jenis slot; render browser wajar berdetik-detik
+LATENCY_TARGETS = {"http": UPSTREAM_LATENCY_TARGET, "browser": UPSTREAM_BROWSER_LATENCY_TARGET}
+
+
+def _limit(host, kind):
+    with _limits_lock:
+        limit = _limits.get((host, kind))
+        if limit is None:
+            limit = _limits[(host, kind)] = AdaptiveLimit(latency_target=LATENCY_TARGETS[kind])
+        return limit
+
+
+def _failed(status):
+    # 429 / 5xx = upstream kewalahan; 404 dan sejenisnya bukan sinyal beban
+    return status is not None and (status == 429 or status >= 500)
+
+
+class Slot:
+    __slots__ = ("status",)
+
+    def __init__(self):
+        self.status = None   # isi dengan status HTTP supaya 4xx biasa tidak dihitung error
+
+
+def _reserve(host, limit):
+    if _bucket is None:
+        return 0.0
+    try:
+        return _bucket.reserve(host, UPSTREAM_QUEUE_TIMEOUT)
+    except Overloaded:
+        limit.reject()
+        raise
+
+
+@contextmanager
+def slot(url, kind="http"):
+    host = urlsplit(url).hostname or ""
+    limit = _limit(host, kind)
+    start = time.perf_counter()
+    wait = _reserve(host, limit)
+    if wait:
+        time.sleep(wait)
+    limit.acquire(UPSTREAM_QUEUE_TIMEOUT - wait)
+    began = time.perf_counter()
+    if began - start >= 0.001:
+        metrics.record("upstream_queue", began - start)
+    current = Slot()
+    failed = False
+    try:
+        yield current
+    except BaseException:
+        failed = current.status is None
+        raise
+    finally:
+        limit.release(time.perf_counter() - began, failed or _failed(current.status))
+
+
+@asynccontextmanager
+async def aslot(url, kind="http"):
+    host = urlsplit(url).hostname or ""
+    limit = _limit(host, kind)
+    start = time.perf_counter()
+    wait = _reserve(host, limit)
+    if wait:
+        await asyncio.sleep(wait)
+    await limit.aacquire(UPSTREAM_QUEUE_TIMEOUT - wait)
+    began = time.perf_counter()
+    if began - start >= 0.001:
+        metrics.record("upstream_queue", began - start)
+    current = Slot()
+    failed = False
+    try:
+        yield current
+    except asyncio.CancelledError:
+        # klien putus, bukan sinyal beban upstream
+        raise
+    except BaseException:
+        failed = current.status is None
+        raise
+    finally:
+        limit.release(time.perf_counter() - began, failed or _failed(current.status))
+
+
+def stats():
+    """{jenis: {host: stats}}"""
+    with _limits_lock:
+        limits = dict(_limits)
+    result = {}
+    for (host, kind), limit in limits.items():
+        result.setdefault(kind, {})[host] = limit.stats()
+    return result
+
+
+@metrics.registry.collector
+def _collect():
+    rows = [({"host": host, "kind": kind}, v) for kind, hosts in stats().items() for host, v in hosts.items()]
+    yield "mangaku_upstream_concurrency_limit", "gauge", "Batas konkurensi adaptif per host upstream", [
+        (labels, v["limit"]) for labels, v in rows]
+    yield "mangaku_upstream_inflight", "gauge", "Request upstream yang sedang berjalan per host", [
+        (labels, v["inflight"]) for labels, v in rows]
+    yield "mangaku_upstream_waiting", "gauge", "Request yang menunggu slot upstream per host", [
+        (labels, v["waiting"]) for labels, v in rows]
+    yield "mangaku_upstream_limited_total", "counter", "Request yang ditolak limiter (503) per host dan sebab", [
+        (dict(labels, reason=reason), v[reason]) for labels, v in rows for reason in ("rejected", "timeout")]
@@ -0,0 +1,227 @@
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Bucket histogram (detik), dari parse kecil sampai navigasi browser yang lambat
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _num(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_labels(self.labels, key)} {_num(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    state[0][i] += 1
+            state[1] += seconds
+            state[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._values.items())
+        names = self.labels + ("le",)
+        for key, (counts, total, count) in items:
+            for bound, c in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_labels(names, key + (bound,))} {c}")
+            lines.append(f"{self.name}_bucket{_labels(names, key + ('+Inf',))} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_num(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Registry:
+    """Kumpulan metrik untuk /metrics (format teks Prometheus).
+
+    Selain counter/histogram milik registry, collector dipanggil saat scrape
+    untuk mengubah stats() modul lain (pool, cache, single-flight) jadi metrik.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help, labels=()):
+        metric = Counter(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labels=(), buckets=BUCKETS):
+        metric = Histogram(name, help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        # fn() -> iterable (name, type, help, [(labels_dict, value), ...])
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for fn in self._collectors:
+            for name, kind, help, samples in fn():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {_num(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUESTS = registry.counter("mangaku_requests_total", "Jumlah request per route dan status", ("route", "status"))
+REQUEST_SECONDS = registry.histogram("mangaku_request_duration_seconds", "Durasi request per route", ("route",))
+PHASE_SECONDS = registry.histogram("mangaku_phase_duration_seconds",
+                                   "Durasi fase (upstream, browser, parse, serialize) per route", ("route", "phase"))
+UPSTREAM_ERRORS = registry.counter("mangaku_upstream_errors_total",
+                                   "Error ke upstream per jenis (timeout, connection, status, browser)", ("kind",))
+
+
+# --- TIMING PER REQUEST ---
+class Timing:
+    __slots__ = ("route", "start", "phases", "lock")
+
+    def __init__(self, route):
+        self.route = route
+        self.start = time.perf_counter()
+        self.phases = {}
+        self.lock = threading.Lock()
+
+    def add(self, phase, seconds):
+        with self.lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+
+# contextvars: ikut ke task asyncio; thread pool perlu copy_context() eksplisit
+_current = contextvars.ContextVar("mangaku_timing", default=None)
+
+# jumlah request yang sedang diproses (kerja background seperti prefetch mengalah kalau ramai)
+_inflight = 0
+_inflight_lock = threading.Lock()
+
+
+def _add_inflight(delta):
+    global _inflight
+    with _inflight_lock:
+        _inflight += delta
+
+
+def inflight():
+    return _inflight
+
+
+def begin(route):
+    timing = Timing(route)
+    _current.set(timing)
+    _add_inflight(1)
+    return timing
+
+
+def detach():
+    # kerja background (refresh cache, prefetch) tidak dihitung ke request pemicunya
+    _current.set(None)
+
+
+def end(status):
+    """Tutup timing request aktif, catat metriknya, kembalikan nilai header Server-Timing."""
+    timing = _current.get()
+    if timing is None:
+        return None
+    _current.set(None)
+    _add_inflight(-1)
+    total = time.perf_counter() - timing.start
+    REQUESTS.inc(route=timing.route, status=str(status))
+    REQUEST_SECONDS.observe(total, route=timing.route)
+    with timing.lock:
+        phases = list(timing.phases.items())
+    parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in phases]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def record(phase, seconds):
+    timing = _current.get()
+    route = timing.route if timing is not None else "background"
+    PHASE_SECONDS.observe(seconds, route=route, phase=phase)
+    if timing is not None:
+        timing.add(phase, seconds)
+
+
+@contextmanager
+def phase(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def timed(name):
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with phase(name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def upstream_error(kind):
+    UPSTREAM_ERRORS.inc(kind=kind)
+
+
+@registry.collector
+def _collect():
+    yield "mangaku_requests_in_flight", "gauge", "Request yang sedang diproses", [({}, inflight())]
@@ -0,0 +1,195 @@
+import base64
+import binascii
+import hashlib
+from urllib.parse import urlencode
+
+import scraper
+from cache import cache
+from config import CACHE_TTL, PAGINATION_DEFAULT_LIMIT, PAGINATION_MAX_LIMIT
+
+# Paginasi /latest* dan /popular* di atas halaman /pustaka upstream.
+# Respons tetap list komik; posisi dibawa header: X-Next-Cursor + Link rel="next".
+# Setiap halaman upstream di-cache sendiri ("latest:<tipe>" untuk halaman 1, sama dengan
+# route tanpa paginasi, lalu "latest:<tipe>:p<N>"), jadi window berurutan memakai ulang
+# halaman yang sudah diambil. Ukuran halaman upstream = jumlah kartu di halaman 1.
+#
+# Cursor = offset + identitas item terakhir yang sudah dikirim. Urutan upstream bisa
+# bergeser di antara dua request (komik baru naik ke atas): kalau item sebelum offset
+# bukan item itu lagi, window disejajarkan ulang ke posisi barunya dan respons diberi
+# X-Results-Shifted: 1.
+
+LOADERS = {
+    "latest": (scraper.latest, scraper.alatest),
+    "popular": (scraper.popular, scraper.apopular),
+}
+
+
+class PageError(ValueError):
+    # ?page / ?limit / ?cursor tidak valid -> 400
+    pass
+
+
+class PageRequest:
+    __slots__ = ("offset", "limit", "anchor")
+
+    def __init__(self, offset, limit, anchor=None):
+        self.offset = offset
+        self.limit = limit
+        self.anchor = anchor
+
+
+class Window:
+    __slots__ = ("items", "offset", "shifted", "next_cursor", "next_page")
+
+    def __init__(self, items, offset, shifted, next_cursor, next_page):
+        self.items = items
+        self.offset = offset
+        self.shifted = shifted
+        self.next_cursor = next_cursor
+        self.next_page = next_page   # halaman upstream setelah window (untuk prefetch), None kalau habis
+
+
+def requested(args):
+    return any(name in args for name in ("page", "limit", "cursor"))
+
+
+# --- CURSOR ---
+def identity(item):
+    return hashlib.sha1((item.get("link") or item.get("title") or "").encode("utf-8")).hexdigest()[:10]
+
+
+def encode_cursor(offset, item):
+    raw = f"{offset}.{identity(item)}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii")
+        offset, anchor = raw.split(".", 1)
+        offset = int(offset)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise PageError("cursor tidak valid")
+    if offset < 0:
+        raise PageError("cursor tidak valid")
+    return offset, anchor
+
+
+def parse(args):
+    """PageRequest dari ?page=N&limit=M atau ?cursor=...&limit=M."""
+    try:
+        limit = int(args.get("limit") or PAGINATION_DEFAULT_LIMIT)
+        page = int(args.get("page") or 1)
+    except ValueError:
+        raise PageError("page dan limit harus angka")
+    if limit < 1 or page < 1:
+        raise PageError("page dan limit minimal 1")
+    limit = min(limit, PAGINATION_MAX_LIMIT)
+    cursor = args.get("cursor")
+    if cursor:
+        offset, anchor = decode_cursor(cursor)
+        return PageRequest(offset, limit, anchor)
+    return PageRequest((page - 1) * limit, limit)
+
+
+# --- HALAMAN UPSTREAM ---
+def page_key(name, tipe, page):
+    return f"{name}:{tipe}" if page == 1 else f"{name}:{tipe}:p{page}"
+
+
+def load_page(name, tipe, page):
+    return cache.get_or_load(page_key(name, tipe, page), CACHE_TTL[name],
+                             lambda: LOADERS[name][0](tipe, page))
+
+
+async def aload_page(name, tipe, page):
+    return await cache.aget_or_load(page_key(name, tipe, page), CACHE_TTL[name],
+                                    lambda: LOADERS[name][1](tipe, page))
+
+
+def _needed(per_page, req, realign=False):
+    # satu item sebelum offset ikut dibaca untuk cek anchor; saat menyejajarkan ulang,
+    # cari sampai satu halaman lebih jauh (item bergeser ke bawah karena komik baru)
+    start = max(0, req.offset - 1) if req.anchor else req.offset
+    end = req.offset + req.limit + (per_page if realign else 0)
+    return range(start // per_page + 1, (end - 1) // per_page + 2)
+
+
+def _window(pages, per_page, req, final):
+    """Window dari halaman upstream yang sudah dimuat; None kalau anchor hilang dan perlu halaman lebih."""
+    items, total = {}, None
+    for number in sorted(pages):
+        rows = pages[number]
+        base = (number - 1) * per_page
+        for i, row in enumerate(rows):
+            items[base + i] = row
+        if len(rows) < per_page:
+            total = base + len(rows)
+            break
+
+    offset, shifted = req.offset, False
+    if req.anchor and offset > 0:
+        before = items.get(offset - 1)
+        if before is None or identity(before) != req.anchor:
+            found = next((i for i in sorted(items) if identity(items[i]) == req.anchor), None)
+            if found is None and not final:
+                return None
+            shifted = True
+            if found is not None:
+                offset = found + 1
+
+    window = []
+    for i in range(offset, offset + req.limit):
+        if i not in items:
+            break
+        window.append(items[i])
+    end = offset + len(window)
+    if not window or (total is not None and end >= total):
+        return Window(window, offset, shifted, None, None)
+    return Window(window, offset, shifted, encode_cursor(end, window[-1]), (end - 1) // per_page + 2)
+
+
+def _missing(pages, per_page, numbers):
+    # berhenti di halaman setelah halaman pendek: listing sudah habis
+    for number in numbers:
+        if number in pages:
+            continue
+        if number - 1 in pages and len(pages[number - 1]) < per_page:
+            return
+        yield number
+
+
+def window(name, tipe, req):
+    pages = {1: load_page(name, tipe, 1)}
+    per_page = len(pages[1])
+    if not per_page:
+        return Window([], req.offset, False, None, None)
+    for realign in (False, True):
+        for number in _missing(pages, per_page, _needed(per_page, req, realign)):
+            pages[number] = load_page(name, tipe, number)
+        result = _window(pages, per_page, req, final=realign)
+        if result is not None:
+            return result
+
+
+async def awindow(name, tipe, req):
+    pages = {1: await aload_page(name, tipe, 1)}
+    per_page = len(pages[1])
+    if not per_page:
+        return Window([], req.offset, False, None, None)
+    for realign in (False, True):
+        for number in _missing(pages, per_page, _needed(per_page, req, realign)):
+            pages[number] = await aload_page(name, tipe, number)
+        result = _window(pages, per_page, req, final=realign)
+        if result is not None:
+            return result
+
+
+def headers(path, limit, window):
+    result = {}
+    if window.next_cursor:
+        result["X-Next-Cursor"] = window.next_cursor
+        result["Link"] = f'<{path}?{urlencode({"cursor": window.next_cursor, "limit": limit})}>; rel="next"'
+    if window.shifted:
+        result["X-Results-Shifted"] = "1"
+    return result
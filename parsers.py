@@ -0,0 +1,131 @@
+import soupsieve as sv
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+
+from config import PARSER_BACKEND
+
+
+def _pick_backend(name):
+    if name in ("auto", "lxml"):
+        try:
+            import lxml  # noqa: F401
+            return "lxml"
+        except ImportError:
+            if name == "lxml":
+                raise
+    return "html.parser"
+
+
+BACKEND = _pick_backend(PARSER_BACKEND)
+
+
+def has_class(name):
+    # saat parsing, atribut class masih string mentah ("bge xyz"), bukan list
+    def match(value):
+        if not value:
+            return False
+        return name in (value.split() if isinstance(value, str) else value)
+    return match
+
+
+def make_soup(html, only=None):
+    return BeautifulSoup(html, BACKEND, parse_only=only)
+
+
+# --- SPEC KARTU ---
+class CardSpec:
+    """Spesifikasi ekstraksi satu jenis kartu listing.
+
+    Setiap field adalah rantai selector keturunan [(tag, class), ...] yang
+    setara dengan CSS "tag.class tag.class ...". Semua field dicocokkan dalam
+    satu kali jalan (walk) di subtree kartu, bukan satu select_one per field.
+    """
+
+    def __init__(self, container, fields, multi=()):
+        self.tag, self.cls = container
+        self.only = SoupStrainer(self.tag, attrs={"class": has_class(self.cls)})
+        self.fields = dict(fields)
+        self.multi = frozenset(multi)
+        self._paths = tuple(self.fields.items())
+
+    def extract(self, card):
+        found = {name: ([] if name in self.multi else None) for name in self.fields}
+        start = tuple(1 if len(path) > 1 and _matches(card, path[0]) else 0 for _, path in self._paths)
+        self._walk(card, start, found)
+        return found
+
+    def _walk(self, el, progress, found):
+        paths = self._paths
+        for child in el.contents:
+            if not isinstance(child, Tag):
+                continue
+            child_progress = []
+            for i, (name, path) in enumerate(paths):
+                k = progress[i]
+                if _matches(child, path[k]):
+                    if k == len(path) - 1:
+                        if name in self.multi:
+                            found[name].append(child)
+                        elif found[name] is None:
+                            found[name] = child
+                    else:
+                        k += 1
+                child_progress.append(k)
+            self._walk(child, child_progress, found)
+
+    def cards(self, html):
+        soup = make_soup(html, self.only)
+        for card in soup.find_all(self.tag, class_=self.cls):
+            yield self.extract(card)
+
+
+def _matches(el, step):
+    tag, cls = step
+    if el.name != tag:
+        return False
+    return cls is None or cls in el.get("class", ())
+
+
+# Kartu div.bge di /pustaka, /genre dan halaman search
+BGE_CARD = CardSpec(
+    ("div", "bge"),
+    fields={
+        "title": (("div", "kan"), ("h3", None)),
+        "img": (("div", "bgei"), ("img", None)),
+        "link": (("div", "bgei"), ("a", None)),
+        "type": (("div", "tpe1_inf"), ("b", None)),
+        "genre": (("div", "tpe1_inf"),),
+        "info": (("span", "judul2"),),
+        "readers": (("span", "judul2"), ("span", None), ("b", None)),
+        "description": (("div", "kan"), ("p", None)),
+        "new_links": (("div", "new1"), ("a", None)),
+    },
+    multi=("new_links",),
+)
+
+# Kartu div.ls4 di /daftar-komik
+LS4_CARD = CardSpec(
+    ("div", "ls4"),
+    fields={
+        "title": (("h4", None), ("a", None)),
+        "img": (("div", "ls4v"), ("img", "lazy")),
+        "genres": (("span", "ls4s"),),
+    },
+    multi=("genres",),
+)
+
+
+# --- SELECTOR TERKOMPILASI (halaman detail, chapter, genre) ---
+DETAIL_ONLY = SoupStrainer(id=["Judul", "Daftar_Chapter"])
+DETAIL_TITLE = sv.compile('#Judul span[itemprop="name"]')
+DETAIL_SHORT_DESC = sv.compile('#Judul p.j2')
+DETAIL_LONG_DESC = sv.compile('#Judul p[itemprop="description"]')
+DETAIL_SINOPSIS = sv.compile('#Judul p.desc')
+DETAIL_ROWS = sv.compile('#Daftar_Chapter tbody tr')
+
+CHAPTER_TITLE = sv.compile("#Judul header h1")
+CHAPTER_DATE = sv.compile("table.tbl tr:nth-child(2) td:nth-child(2)")
+CHAPTER_FULL_TITLE = sv.compile("table.tbl tr:nth-child(1) td:nth-child(2)")
+CHAPTER_IMAGES = sv.compile("#Baca_Komik img.klazy")
+
+GENRE_SELECT_ONLY = SoupStrainer("select", attrs={"name": "genre"})
+GENRE_OPTIONS = sv.compile("select[name='genre'] option")
@@ -0,0 +1,162 @@
+import itertools
+import logging
+import queue
+import threading
+import time
+
+import batch
+import delta
+import images
+import metrics
+import pagination
+from cache import cache
+from config import (
+    IMAGE_PROXY,
+    PREFETCH_CHAPTERS,
+    PREFETCH_IMAGES,
+    PREFETCH_QUEUE_SIZE,
+    PREFETCH_WORKERS,
+    PREFETCH_MAX_LIVE,
+    PREFETCH_LISTING_PAGES,
+)
+
+log = logging.getLogger(__name__)
+
+# Setelah /manga/<slug>/<chapter_slug>/ dilayani, N chapter berikutnya (dan opsional
+# beberapa gambar pertamanya) dimuat ke cache di background. Satu antrian prioritas
+# global untuk app.py dan asgi.py: task = (jenis, slug, arg), dimuat lewat batch.load
+# sehingga key cache sama dengan route. Prioritas kecil = lebih dulu:
+# 0 rencana (baca daftar chapter), 1..N chapter ke-n, n + 0.5 gambar chapter ke-n.
+# Paginasi /latest* /popular*: halaman upstream setelah window yang dibaca (prioritas = jaraknya).
+
+PLAN, CHAPTER, IMAGE, LISTING = "plan", "chapter", "image", "listing"
+IDLE_POLL = 0.05
+
+_queue = queue.PriorityQueue(max(1, PREFETCH_QUEUE_SIZE))
+_pending = set()
+_seq = itertools.count()
+_lock = threading.Lock()
+_workers = []
+_stats = {"queued": 0, "dropped": 0, "skipped": 0, "done": 0, "error": 0}
+
+
+def _count(name):
+    with _lock:
+        _stats[name] += 1
+
+
+def stats():
+    with _lock:
+        result = dict(_stats)
+    result["depth"] = _queue.qsize()
+    result["workers"] = len(_workers)
+    return result
+
+
+def next_chapters(chapters, current, n=PREFETCH_CHAPTERS):
+    """Slug n chapter setelah `current` dalam urutan baca (daftar chapter urut terbaru dulu)."""
+    slugs = [delta.chapter_slug(c["url"]) for c in chapters]
+    try:
+        i = slugs.index(delta.chapter_slug(current))
+    except ValueError:
+        return []
+    return slugs[max(0, i - n):i][::-1]
+
+
+def _fresh(key):
+    # tanpa menghitung ke stats hit/miss cache
+    validators = cache.validators(key)
+    return validators is not None and validators[2] > time.time()
+
+
+def _put(priority, task):
+    with _lock:
+        if task in _pending:
+            return False
+        _pending.add(task)
+    try:
+        _queue.put_nowait((priority, next(_seq), task))
+    except queue.Full:
+        with _lock:
+            _pending.discard(task)
+            _stats["dropped"] += 1
+        return False
+    _count("queued")
+    return True
+
+
+def _run(priority, task):
+    kind, slug, arg = task
+    if kind == PLAN:
+        detail = batch.load(slug, None)
+        for distance, chapter in enumerate(next_chapters(detail["chapters"], arg), 1):
+            if _fresh(f"chapter:{slug}:{chapter}"):
+                _count("skipped")
+                continue
+            _put(distance, (CHAPTER, slug, chapter))
+    elif kind == CHAPTER:
+        data = batch.load(slug, arg)
+        if PREFETCH_IMAGES and IMAGE_PROXY:
+            for url in data["page_images"][:PREFETCH_IMAGES]:
+                _put(priority + 0.5, (IMAGE, slug, images.origin_url(url)))
+    elif kind == IMAGE:
+        images.get(arg)
+    elif kind == LISTING:
+        tipe, page = arg
+        pagination.load_page(slug, tipe, page)
+
+
+def _worker():
+    metrics.detach()
+    while True:
+        priority, _, task = _queue.get()
+        try:
+            # mengalah ke request live: tunggu sampai server tidak sedang ramai
+            while metrics.inflight() >= PREFETCH_MAX_LIVE:
+                time.sleep(IDLE_POLL)
+            _run(priority, task)
+            _count("done")
+        except Exception as e:
+            _count("error")
+            log.info("prefetch %s failed: %s", task, e)
+        finally:
+            with _lock:
+                _pending.discard(task)
+
+
+def _start():
+    with _lock:
+        if _workers:
+            return
+        for i in range(max(1, PREFETCH_WORKERS)):
+            thread = threading.Thread(target=_worker, name=f"prefetch-{i}", daemon=True)
+            thread.start()
+            _workers.append(thread)
+
+
+def schedule(slug, chapter_slug):
+    """Antrikan prefetch chapter setelah `chapter_slug`. Tidak memblok; penuh = dibuang."""
+    if PREFETCH_CHAPTERS <= 0:
+        return
+    _start()
+    _put(0, (PLAN, slug, chapter_slug))
+
+
+def schedule_listing(name, tipe, page):
+    """Antrikan halaman upstream `page` (dan berikutnya) listing latest/popular yang belum fresh."""
+    if page is None or PREFETCH_LISTING_PAGES <= 0:
+        return
+    _start()
+    for distance, number in enumerate(range(page, page + PREFETCH_LISTING_PAGES), 1):
+        if _fresh(pagination.page_key(name, tipe, number)):
+            _count("skipped")
+            continue
+        _put(distance, (LISTING, name, (tipe, number)))
+
+
+@metrics.registry.collector
+def _collect():
+    s = stats()
+    yield "mangaku_prefetch_tasks_total", "counter", "Task prefetch per hasil", [
+        ({"result": name}, s[name]) for name in ("queued", "dropped", "skipped", "done", "error")]
+    yield "mangaku_prefetch_queue_depth", "gauge", "Task prefetch yang menunggu di antrian", [({}, s["depth"])]
@@ -0,0 +1,309 @@
+import asyncio
+from typing import Callable, NamedTuple, Optional
+
+import browser_pool
+import catalog
+import conditional
+import delta
+import encoding
+import fetch
+import images
+import limiter
+import pagination
+import prefetch
+import scraper
+import searchindex
+import snapshots
+from cache import cache
+from config import CACHE_TTL
+
+# Logika route bersama app.py (Flask) dan asgi.py (Quart).
+#
+# Handler di sini berupa generator: setiap I/O di-yield sebagai Step, lalu dijalankan oleh
+# run() (app.py, dipanggil langsung) atau arun() (asgi.py, coroutine-nya di-await; fungsi
+# sync seperti query SQLite katalog dijalankan lewat asyncio.to_thread supaya event loop
+# tidak tertahan). Handler mengembalikan Reply; app tinggal mengubahnya jadi respons JSON.
+
+
+class Step(NamedTuple):
+    call: Callable                      # versi sync (app.py)
+    acall: Optional[Callable] = None    # coroutine function (asgi.py); None -> call di thread
+
+
+class Reply(NamedTuple):
+    body: object                        # data JSON (sudah diproyeksikan ?fields=), None -> body kosong
+    status: int = 200
+    headers: Optional[dict] = None
+
+
+def run(handler):
+    """Jalankan handler secara sync; exception dari Step dilempar balik ke handler."""
+    value, error = None, None
+    while True:
+        try:
+            step = handler.throw(error) if error is not None else handler.send(value)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            value, error = step.call(), None
+        except Exception as e:
+            value, error = None, e
+
+
+async def arun(handler):
+    """Seperti run(), tapi Step dijalankan tanpa menahan event loop."""
+    value, error = None, None
+    while True:
+        try:
+            step = handler.throw(error) if error is not None else handler.send(value)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            if step.acall is not None:
+                value = await step.acall()
+            else:
+                value = await asyncio.to_thread(step.call)
+            error = None
+        except Exception as e:
+            value, error = None, e
+
+
+def _cached(key, ttl, load, aload):
+    return Step(lambda: cache.get_or_load(key, ttl, load), lambda: cache.aget_or_load(key, ttl, aload))
+
+
+# --- BENTUK RESPONS ---
+def fields(req):
+    # ?fields=title,link,thumbnail: key lain tidak di-serialize maupun dikirim
+    return encoding.parse_fields(req.args.get("fields"))
+
+
+def wants_stream(req):
+    return req.args.get("stream") == "ndjson"
+
+
+def error(e, status=500):
+    # limiter.Overloaded: upstream sedang dibatasi -> 503 + Retry-After supaya klien mundur
+    if isinstance(e, limiter.Overloaded):
+        return Reply({"error": str(e)}, 503, {"Retry-After": str(e.retry_after)})
+    return Reply({"error": str(e)}, status)
+
+
+def _json(req, body, key=None, ttl=None, headers=None):
+    # validator dari entry cache `key`: If-None-Match yang cocok -> 304 tanpa serialize body
+    headers = {**conditional.headers(req.full_path, cache.validators(key) if key else None, ttl), **(headers or {})}
+    if conditional.not_modified(req.headers, headers):
+        return Reply(None, 304, headers)
+    return Reply(encoding.project(body, fields(req)), 200, headers)
+
+
+def _listing(page, manga_data):
+    return {
+        "page": page,
+        "count" : len(manga_data),
+        "List_Manga": manga_data
+    }
+
+
+# --- STATUS API ---
+def status():
+    return {
+        "Message": "API is running",
+        "Status": "Online",
+        "Response": "200"
+    }
+
+
+# --- STATISTIK FETCH ---
+def stats(singleflight):
+    return {
+        "fetch": fetch.stats(),
+        "browser_pool": browser_pool.pool.stats(),
+        "cache": cache.stats(),
+        "singleflight": singleflight.stats(),
+        "catalog": catalog.catalog.stats() if catalog.catalog is not None else None,
+        "images": images.stats(),
+        "prefetch": prefetch.stats(),
+        "limiter": limiter.stats(),
+        "snapshots": snapshots.stats(),
+        "encoding": encoding.stats()
+    }
+
+
+# --- DETAIL KOMIK ---
+def detail_key(slug):
+    return f"detail:{slug}"
+
+
+def manga_detail(req, slug):
+    key = detail_key(slug)
+    try:
+        data = yield _cached(key, CACHE_TTL["detail"],
+                             lambda: catalog.remember_detail(slug, scraper.manga_detail(slug)),
+                             lambda: catalog.aremember_detail(slug, scraper.amanga_detail(slug)))
+    except Exception as e:
+        return error(e)
+
+    # ETag = hash isi detail + path lengkap, sama dengan route lain: setiap ?fields= / ?since= punya
+    # representasi (dan ETag) sendiri. ?since=<chapter_slug> hanya kirim chapter yang lebih baru.
+    headers = conditional.headers(req.full_path, cache.validators(key), CACHE_TTL["detail"])
+    if conditional.not_modified(req.headers, headers):
+        return Reply(None, 304, headers)
+
+    since = req.args.get("since")
+    if since is None:
+        return Reply(encoding.project(data, fields(req)), 200, headers)
+
+    chapters, found = delta.since(data["chapters"], since)
+    if found and not chapters:
+        return Reply(None, 304, headers)
+    return Reply(encoding.project({
+        "slug": slug,
+        "since": delta.chapter_slug(since),
+        "reset": not found,
+        "count": len(chapters),
+        "chapters": chapters
+    }, fields(req)), 200, headers)
+
+
+def detail_rows(cached):
+    # ?stream=ndjson dari cache: baris pertama info komik, lalu satu baris per chapter
+    return [{k: v for k, v in cached.items() if k != "chapters"}, *cached["chapters"]]
+
+
+# --- ISI CHAPTER ---
+def manga_content(req, slug, chapter_slug):
+    key = f"chapter:{slug}:{chapter_slug}"
+    try:
+        data = yield _cached(key, CACHE_TTL["chapter"],
+                             lambda: scraper.chapter_content(slug, chapter_slug),
+                             lambda: scraper.achapter_content(slug, chapter_slug))
+    except Exception as e:
+        return error(e)
+
+    prefetch.schedule(slug, chapter_slug)
+    return _json(req, data, key, CACHE_TTL["chapter"])
+
+
+# --- KOMIK BY GENRE ---
+def genre_params(req):
+    return req.args.get('orderby', 'update'), int(req.args.get('limit', 30))
+
+
+def genre_key(slug, orderby, limit):
+    return f"genre:{slug}:{orderby}:{limit}"
+
+
+def manga_by_genre(req, slug):
+    orderby, limit = genre_params(req)
+    key = genre_key(slug, orderby, limit)
+    try:
+        manga_list = yield _cached(key, CACHE_TTL["genre"],
+                                   lambda: scraper.manga_by_genre(slug, orderby, limit),
+                                   lambda: scraper.amanga_by_genre(slug, orderby, limit))
+    except Exception as e:
+        return error(e)
+
+    return _json(req, manga_list, key, CACHE_TTL["genre"])
+
+
+# --- LIST SEMUA KOMIK / PER TIPE ---
+def _daftar_key(tipe, page):
+    if not tipe:
+        return f"daftar:page:{page}"
+    return f"daftar:tipe:{tipe}" if page == 1 else f"daftar:tipe:{tipe}:{page}"
+
+
+def daftar(req, tipe=""):
+    page = int(req.args.get("page", 1))
+
+    key = None  # dari katalog, bukan cache: ETag dihitung dari body
+    manga_data = yield Step(lambda: catalog.lookup(tipe, page))
+    if manga_data is None:
+        key = _daftar_key(tipe, page)
+        try:
+            manga_data = yield _cached(key, CACHE_TTL["list"],
+                                       lambda: scraper.daftar_komik(page=page, tipe=tipe or None),
+                                       lambda: scraper.adaftar_komik(page=page, tipe=tipe or None))
+        except Exception as e:
+            return error(e)
+
+    return _json(req, _listing(page, manga_data), key, CACHE_TTL["list"])
+
+
+# --- FITUR SEARCH ---
+def search(req):
+    query = req.args.get('q', '').strip()
+    if not query:
+        return Reply({"error": "Parameter 'q' diperlukan, contoh /search?tokidoki+bosotto"}, 400)
+
+    # index lokal dulu; upstream kalau tidak ada hasil atau diminta dengan ?source=upstream
+    if req.args.get("source") != "upstream":
+        manga_list = yield Step(lambda: searchindex.search(query))
+        if manga_list:
+            return _search_response(req, query, manga_list, "local", None)
+
+    try:
+        manga_list = yield _cached(f"search:{query}", CACHE_TTL["search"],
+                                   lambda: scraper.search(query), lambda: scraper.asearch(query))
+    except Exception as e:
+        return error(e)
+
+    if not manga_list:
+        return Reply({"message": f"tidak menemukan hasil untuk '{query}'"}, 404)
+
+    return _search_response(req, query, manga_list, "upstream", f"search:{query}")
+
+
+def _search_response(req, query, manga_list, source, key):
+    return _json(req, {
+        "query": query,
+        "results": manga_list,
+        "count": len(manga_list)
+    }, key, CACHE_TTL["search"], {"X-Search-Source": source})
+
+
+# --- LIST KOMIK TERBARU / TERPOPULER ---
+def latest(req, tipe=""):
+    return (yield from _pustaka(req, "latest", tipe, scraper.latest, scraper.alatest))
+
+
+def popular(req, tipe=""):
+    return (yield from _pustaka(req, "popular", tipe, scraper.popular, scraper.apopular))
+
+
+def _pustaka(req, name, tipe, load, aload):
+    if pagination.requested(req.args):
+        return (yield from _paged(req, name, tipe))
+    try:
+        manga_list = yield _cached(f"{name}:{tipe}", CACHE_TTL[name], lambda: load(tipe), lambda: aload(tipe))
+    except Exception as e:
+        return error(e)
+
+    return _json(req, manga_list, f"{name}:{tipe}", CACHE_TTL[name])
+
+
+def _paged(req, name, tipe):
+    # ?page=N&limit=M / ?cursor=...: window dari halaman /pustaka yang di-cache per halaman
+    try:
+        page_request = pagination.parse(req.args)
+    except pagination.PageError as e:
+        return Reply({"error": str(e)}, 400)
+    try:
+        window = yield Step(lambda: pagination.window(name, tipe, page_request),
+                            lambda: pagination.awindow(name, tipe, page_request))
+    except Exception as e:
+        return error(e)
+
+    prefetch.schedule_listing(name, tipe, window.next_page)
+    return _json(req, window.items, None, CACHE_TTL[name], pagination.headers(req.path, page_request.limit, window))
+
+
+# --- LIST GENRE ---
+def genre_list(req):
+    try:
+        genres = yield _cached("genres", CACHE_TTL["genres"], scraper.genre_list, scraper.agenre_list)
+    except Exception as e:
+        return error(e)
+
+    return _json(req, genres, "genres", CACHE_TTL["genres"])
@@ -0,0 +1,384 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+import extract
+import fetch
+import http_client
+import images
+import metrics
+import parsers
+import snapshots
+from config import BASE_URL, API_BASE, GENRE_PAGE_SIZE, GENRE_FANOUT_CONCURRENCY
+
+# Setiap halaman punya parser murni (parse_*() atau skema di extract.py),
+# versi sync untuk app.py dan versi a*() (async) untuk mode ASGI di asgi.py.
+# Parse lewat snapshots.parse: HTML yang tidak berubah sejak fetch terakhir tidak di-parse ulang.
+# Versi async (a*) mem-parse di thread (snapshots.aparse) supaya event loop tidak tertahan.
+
+
+# --- DETAIL KOMIK ---
+def iter_manga_detail(html, slug):
+    """Generator: dict info komik dulu, lalu satu dict per baris #Daftar_Chapter."""
+    soup = parsers.make_soup(html, parsers.DETAIL_ONLY)
+
+    title_tag = parsers.DETAIL_TITLE.select_one(soup)
+    title = title_tag.text.strip() if title_tag else ""
+
+    short_desc_tag = parsers.DETAIL_SHORT_DESC.select_one(soup)
+    short_description = short_desc_tag.text.strip() if short_desc_tag else ""
+
+    long_desc_tag = parsers.DETAIL_LONG_DESC.select_one(soup)
+    long_description = long_desc_tag.text.strip() if long_desc_tag else ""
+
+    sinopsis_tag = parsers.DETAIL_SINOPSIS.select_one(soup)
+    sinopsis = sinopsis_tag.text.strip() if sinopsis_tag else ""
+
+    yield {
+        "title": title,
+        "short_description": short_description,
+        "long_description": long_description,
+        "sinopsis": sinopsis,
+    }
+
+    for row in parsers.DETAIL_ROWS.select(soup):
+        cols = row.find_all('td')
+        if not cols:
+            continue
+
+        a_tag = cols[0].find('a')
+        if not a_tag:
+            continue
+
+        chapter_title = a_tag.text.strip()
+        raw_url = a_tag.get('href', '')
+
+        # 🔹 Ekstrak slug chapter dari href (biasanya seperti /manga/owari-no-seraph-chapter-151/)
+        chapter_slug = raw_url.strip('/').split('/')[-1].replace(f"{slug}-", "")
+
+        # 🔹 Buat URL API lokal agar sesuai dengan route isi chapter
+        chapter_url = f"{API_BASE}/manga/{slug}/{chapter_slug}/"
+
+        views = cols[1].text.strip() if len(cols) > 1 else ""
+        date = cols[2].text.strip() if len(cols) > 2 else ""
+
+        yield {
+            "title": chapter_title,
+            "url": chapter_url,
+            "views": views,
+            "date": date
+        }
+
+
+@metrics.timed("parse")
+def parse_manga_detail(html, slug):
+    rows = iter_manga_detail(html, slug)
+    detail = next(rows)
+    detail["chapters"] = list(rows)
+    return detail
+
+
+def manga_detail_url(slug):
+    return f"{BASE_URL}/manga/{slug}/"
+
+
+def _detail(slug, url, html):
+    return snapshots.parse(f"detail:{slug}", url, html, lambda html: parse_manga_detail(html, slug))
+
+
+def manga_detail(slug):
+    url = manga_detail_url(slug)
+    return _detail(slug, url, http_client.get_text(url))
+
+
+async def amanga_detail(slug):
+    url = manga_detail_url(slug)
+    html = await http_client.aget_text(url)
+    return await asyncio.to_thread(_detail, slug, url, html)
+
+
+def manga_detail_stream(slug):
+    # fetch dulu (error muncul sebelum stream dimulai), parse baris demi baris saat dikirim
+    url = manga_detail_url(slug)
+    html = http_client.get_text(url)
+    snapshots.record(url, html)
+    return iter_manga_detail(html, slug)
+
+
+async def amanga_detail_stream(slug):
+    url = manga_detail_url(slug)
+    html = await http_client.aget_text(url)
+    snapshots.record(url, html)
+    # Quart mengiterasi generator sync di event loop: parse seluruhnya di thread
+    return await asyncio.to_thread(lambda: list(iter_manga_detail(html, slug)))
+
+
+# --- ISI CHAPTER ---
+@metrics.timed("parse")
+def parse_chapter(html, slug, chapter_slug):
+    soup = parsers.make_soup(html)
+
+    title_elem = parsers.CHAPTER_TITLE.select_one(soup)
+    chapter_title = title_elem.text.strip() if title_elem else chapter_slug
+
+    date_elem = parsers.CHAPTER_DATE.select_one(soup)
+    release_date = date_elem.text.strip() if date_elem else ""
+
+    full_title_elem = parsers.CHAPTER_FULL_TITLE.select_one(soup)
+    full_title = full_title_elem.text.strip() if full_title_elem else ""
+
+    page_images = []
+    for img in parsers.CHAPTER_IMAGES.select(soup):
+        src = img.get("src")
+        if src and src.startswith("https://img.komiku.org"):
+            page_images.append(images.proxy_url(src.strip()))
+
+    return {
+        "slug": slug,
+        "chapter_slug": chapter_slug,
+        "chapter_title": chapter_title,
+        "release_date": release_date,
+        "full_title": full_title,
+        "page_images": page_images
+    }
+
+
+def chapter_url(slug, chapter_slug):
+    return f'{BASE_URL}/{slug}-{chapter_slug}/'
+
+
+def _chapter(slug, chapter_slug, url, html):
+    return snapshots.parse(f"chapter:{slug}:{chapter_slug}", url, html,
+                           lambda html: parse_chapter(html, slug, chapter_slug))
+
+
+def chapter_content(slug, chapter_slug):
+    url = chapter_url(slug, chapter_slug)
+    return _chapter(slug, chapter_slug, url, http_client.get_text(url))
+
+
+async def achapter_content(slug, chapter_slug):
+    url = chapter_url(slug, chapter_slug)
+    html = await http_client.aget_text(url)
+    return await asyncio.to_thread(_chapter, slug, chapter_slug, url, html)
+
+
+# --- KOMIK BY GENRE ---
+def genre_page_url(slug, orderby, page):
+    return f"{BASE_URL}/genre/{slug}/?orderby={orderby}&page={page}"
+
+
+def _genre_page(slug, orderby, page):
+    url = genre_page_url(slug, orderby, page)
+    return snapshots.parse("bge", url, fetch.fetch_listing("genre", url), extract.BGE_LISTING.extract)
+
+
+async def _agenre_page(slug, orderby, page):
+    url = genre_page_url(slug, orderby, page)
+    return await snapshots.aparse("bge", url, await fetch.afetch_listing("genre", url), extract.BGE_LISTING.extract)
+
+
+def iter_manga_by_genre(slug, orderby, limit, concurrency=GENRE_FANOUT_CONCURRENCY):
+    # Hitung jumlah halaman yang dibutuhkan limit, ambil paralel, kirim item sesuai urutan
+    # halaman begitu halaman tersebut (dan semua sebelumnya) selesai
+    sent = 0
+    page = 1
+    per_page = GENRE_PAGE_SIZE
+    executor = ThreadPoolExecutor(max(1, concurrency), thread_name_prefix="genre-fanout")
+
+    try:
+        while sent < limit:
+            needed = -(-(limit - sent) // per_page)
+            pages = list(range(page, page + needed))
+            # copy_context: timing fase di worker tetap tercatat ke request ini
+            futures = [executor.submit(contextvars.copy_context().run, _genre_page, slug, orderby, p) for p in pages]
+
+            exhausted = False
+            for p, future in zip(pages, futures):
+                if exhausted:
+                    future.cancel()
+                    continue
+                try:
+                    items = future.result()
+                except Exception:
+                    # halaman pertama gagal = error; halaman lanjutan gagal = anggap habis
+                    if not sent:
+                        raise
+                    items = []
+                if not items:
+                    exhausted = True
+                    continue
+                per_page = max(per_page, len(items))
+                items = items[:limit - sent]
+                sent += len(items)
+                yield from items
+
+            if exhausted:
+                break
+            page += needed
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def manga_by_genre(slug, orderby, limit, concurrency=GENRE_FANOUT_CONCURRENCY):
+    return list(iter_manga_by_genre(slug, orderby, limit, concurrency))
+
+
+async def aiter_manga_by_genre(slug, orderby, limit, concurrency=GENRE_FANOUT_CONCURRENCY):
+    sent = 0
+    page = 1
+    per_page = GENRE_PAGE_SIZE
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def fetch_page(p):
+        async with semaphore:
+            return await _agenre_page(slug, orderby, p)
+
+    while sent < limit:
+        needed = -(-(limit - sent) // per_page)
+        pages = list(range(page, page + needed))
+        tasks = [asyncio.ensure_future(fetch_page(p)) for p in pages]
+
+        exhausted = False
+        try:
+            for task in tasks:
+                if exhausted:
+                    break
+                try:
+                    items = await task
+                except Exception:
+                    if not sent:
+                        raise
+                    items = []
+                if not items:
+                    exhausted = True
+                    continue
+                per_page = max(per_page, len(items))
+                items = items[:limit - sent]
+                sent += len(items)
+                for item in items:
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        if exhausted:
+            break
+        page += needed
+
+
+async def amanga_by_genre(slug, orderby, limit, concurrency=GENRE_FANOUT_CONCURRENCY):
+    return [item async for item in aiter_manga_by_genre(slug, orderby, limit, concurrency)]
+
+
+# --- LIST SEMUA KOMIK ---
+def daftar_komik_url(page=None, tipe=None):
+    if page is not None and tipe and page > 1:
+        return f"{BASE_URL}/daftar-komik/page/{page}/?tipe={tipe}"
+    if page is not None and not tipe:
+        return f"{BASE_URL}/daftar-komik/page/{page}/"
+    return f"{BASE_URL}/daftar-komik/?tipe={tipe}"
+
+
+def daftar_komik(page=None, tipe=None):
+    url = daftar_komik_url(page, tipe)
+    return snapshots.parse("ls4", url, http_client.get_text(url), extract.LS4_LISTING.extract)
+
+
+async def adaftar_komik(page=None, tipe=None):
+    url = daftar_komik_url(page, tipe)
+    return await snapshots.aparse("ls4", url, await http_client.aget_text(url), extract.LS4_LISTING.extract)
+
+
+# --- FITUR SEARCH ---
+def search_url(query):
+    return f"{BASE_URL}/?post_type=manga&s={query.replace(' ', '+')}"
+
+
+def search(query):
+    url = search_url(query)
+    return snapshots.parse("search", url, fetch.fetch_listing("search", url), extract.BGE_SEARCH.extract)
+
+
+async def asearch(query):
+    url = search_url(query)
+    return await snapshots.aparse("search", url, await fetch.afetch_listing("search", url), extract.BGE_SEARCH.extract)
+
+
+# --- PUSTAKA (TERBARU / TERPOPULER) ---
+def pustaka_url(orderby="", tipe="", genre="", genre2="", status="", page=None):
+    query = urlencode({"orderby": orderby, "tipe": tipe, "genre": genre, "genre2": genre2, "status": status})
+    if page is not None and page > 1:
+        query += f"&page={page}"
+    return f"{BASE_URL}/pustaka/?{query}"
+
+
+def _pustaka_endpoint(name, tipe):
+    return f"{name}-{tipe}" if tipe else name
+
+
+def latest_url(tipe="", page=None):
+    return pustaka_url(orderby="modified", tipe=tipe, page=page)
+
+
+def latest(tipe="", page=None):
+    url = latest_url(tipe, page)
+    html = fetch.fetch_listing(_pustaka_endpoint("latest", tipe), url)
+    return snapshots.parse("bge", url, html, extract.BGE_LISTING.extract)
+
+
+async def alatest(tipe="", page=None):
+    url = latest_url(tipe, page)
+    html = await fetch.afetch_listing(_pustaka_endpoint("latest", tipe), url)
+    return await snapshots.aparse("bge", url, html, extract.BGE_LISTING.extract)
+
+
+def popular_url(tipe="", page=None):
+    return pustaka_url(orderby="meta_value_num", tipe=tipe, page=page)
+
+
+def popular(tipe="", page=None):
+    url = popular_url(tipe, page)
+    html = fetch.fetch_listing(_pustaka_endpoint("popular", tipe), url)
+    return snapshots.parse("bge", url, html, extract.BGE_LISTING.extract)
+
+
+async def apopular(tipe="", page=None):
+    url = popular_url(tipe, page)
+    html = await fetch.afetch_listing(_pustaka_endpoint("popular", tipe), url)
+    return await snapshots.aparse("bge", url, html, extract.BGE_LISTING.extract)
+
+
+# --- LIST GENRE ---
+@metrics.timed("parse")
+def parse_genre_list(html):
+    soup = parsers.make_soup(html, parsers.GENRE_SELECT_ONLY)
+    genre_list = []
+
+    for opt in parsers.GENRE_OPTIONS.select(soup):
+        slug = opt.get("value", "").strip()
+        genre = opt.get_text(strip=True)
+
+        if not slug:
+            continue
+
+        api_link = f"{API_BASE}/genre/{slug}"
+
+        genre_list.append({
+            "genre": genre,
+            "slug": slug,
+            "url": api_link
+        })
+
+    return genre_list
+
+
+def genre_list():
+    url = f"{BASE_URL}/pustaka/"
+    return snapshots.parse("genres", url, http_client.get_text(url), parse_genre_list)
+
+
+async def agenre_list():
+    url = f"{BASE_URL}/pustaka/"
+    return await snapshots.aparse("genres", url, await http_client.aget_text(url), parse_genre_list)
@@ -0,0 +1,212 @@
+import logging
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+
+import catalog
+import images
+from config import SEARCH_LOCAL, SEARCH_LOCAL_LIMIT, SEARCH_RELOAD_INTERVAL
+
+log = logging.getLogger(__name__)
+
+# Bobot field dan jenis kecocokan token
+FIELD_WEIGHTS = {"title": 3.0, "alt_title": 2.0, "genres": 0.5, "description": 1.0}
+EXACT, PREFIX, TYPO = 1.0, 0.8, 0.6
+MAX_PREFIX_TERMS = 50
+MIN_TYPO_LEN = 4
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text):
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii")
+    return text.lower()
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(normalize(text))
+
+
+def _deletes(term):
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def _within_one(a, b):
+    # jarak Damerau-Levenshtein <= 1 (sisip, hapus, ganti, atau tukar dua huruf bersebelahan)
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la == lb:
+        diff = [i for i in range(la) if a[i] != b[i]]
+        if len(diff) == 1:
+            return True
+        return len(diff) == 2 and diff[1] == diff[0] + 1 and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]]
+    if la > lb:
+        a, b = b, a
+    for i in range(len(a) + 1):
+        if a[:i] == b[:i] and a[i:] == b[i + 1:]:
+            return True
+    return False
+
+
+class SearchIndex:
+    """Inverted index in-memory atas judul, judul alternatif, genre dan deskripsi.
+
+    Setiap token query harus cocok (AND) lewat salah satu: sama persis, prefix
+    (search-as-you-type) atau salah ketik satu huruf untuk token >= 4 huruf.
+    """
+
+    def __init__(self, docs=()):
+        self.docs = []
+        self.postings = defaultdict(dict)   # term -> {doc_id: bobot field terbesar}
+        self._deletes = defaultdict(set)     # term tanpa satu huruf -> term asli
+        for doc in docs:
+            self._add(doc)
+        self.vocab = sorted(self.postings)
+        for term in self.vocab:
+            if len(term) >= MIN_TYPO_LEN:
+                for d in _deletes(term):
+                    self._deletes[d].add(term)
+        self._title_norm = [" ".join(tokenize(doc["title"])) for doc in self.docs]
+
+    def __len__(self):
+        return len(self.docs)
+
+    def _add(self, doc):
+        doc_id = len(self.docs)
+        self.docs.append(doc)
+        fields = {
+            "title": doc.get("title", ""),
+            "alt_title": doc.get("alt_title", ""),
+            "genres": " ".join(doc.get("genres") or ()),
+            "description": doc.get("description", ""),
+        }
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS[field]
+            for term in tokenize(text):
+                posting = self.postings[term]
+                if posting.get(doc_id, 0) < weight:
+                    posting[doc_id] = weight
+
+    def _expand(self, token):
+        """term di vocab yang cocok dengan token query -> bobot kecocokan."""
+        matches = {}
+        if token in self.postings:
+            matches[token] = EXACT
+        i = bisect_left(self.vocab, token)
+        for term in self.vocab[i:i + MAX_PREFIX_TERMS]:
+            if not term.startswith(token):
+                break
+            matches.setdefault(term, PREFIX)
+        if len(token) >= MIN_TYPO_LEN:
+            candidates = set(self._deletes.get(token, ()))
+            for d in _deletes(token):
+                if d in self.postings:
+                    candidates.add(d)
+                candidates |= self._deletes.get(d, set())
+            for term in candidates:
+                if term not in matches and _within_one(token, term):
+                    matches[term] = TYPO
+        return matches
+
+    def search(self, query, limit=SEARCH_LOCAL_LIMIT):
+        tokens = tokenize(query)
+        if not tokens or not self.docs:
+            return []
+        scores = None
+        for token in tokens:
+            token_scores = {}
+            for term, match in self._expand(token).items():
+                posting = self.postings[term]
+                idf = 1.0 / (1 + len(posting) / len(self.docs))
+                for doc_id, field in posting.items():
+                    score = match * field * idf
+                    if score > token_scores.get(doc_id, 0):
+                        token_scores[doc_id] = score
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {d: s + token_scores[d] for d, s in scores.items() if d in token_scores}
+            if not scores:
+                return []
+
+        phrase = " ".join(tokens)
+        for doc_id in scores:
+            if self._title_norm[doc_id].startswith(phrase):
+                scores[doc_id] += 2.0
+        ranked = sorted(scores, key=lambda d: (-scores[d], len(self.docs[d]["title"]), self.docs[d]["title"]))
+        return [self.docs[d] for d in ranked[:limit]]
+
+
+# --- INDEX DARI KATALOG ---
+_index = SearchIndex()
+_version = None
+_checked = 0.0
+_lock = threading.Lock()
+_rebuilding = False
+
+
+def _rebuild(version):
+    global _index, _version, _rebuilding
+    try:
+        index = SearchIndex(catalog.catalog.titles())
+        _index, _version = index, version
+        log.info("search index: %d judul (versi katalog %s)", len(index), version)
+    except Exception as e:
+        log.warning("search index rebuild failed: %s", e)
+    finally:
+        _rebuilding = False
+
+
+def current():
+    """Index terbaru. Rebuild pertama sinkron, rebuild berikutnya di background."""
+    global _checked, _rebuilding
+    if not SEARCH_LOCAL or catalog.catalog is None:
+        return None
+    now = time.time()
+    if now - _checked < SEARCH_RELOAD_INTERVAL and _version is not None:
+        return _index
+    with _lock:
+        if now - _checked < SEARCH_RELOAD_INTERVAL and _version is not None:
+            return _index
+        _checked = now
+        try:
+            version = catalog.catalog.version()
+        except Exception as e:
+            log.warning("search index version check failed: %s", e)
+            return _index
+        if version == _version or _rebuilding:
+            return _index
+        _rebuilding = True
+        if _version is None:
+            _rebuild(version)
+        else:
+            threading.Thread(target=_rebuild, args=(version,), name="search-index", daemon=True).start()
+    return _index
+
+
+def to_result(doc):
+    # bentuk sama dengan hasil search upstream (extract.BGE_SEARCH)
+    # genre dari /daftar-komik ikut memuat span status ("Status: Ongoing"), lewati
+    genres = [g for g in doc.get("genres") or () if ":" not in g]
+    return {
+        "title": doc["title"],
+        "type": (doc.get("tipe") or "").capitalize(),
+        "genre": genres[0] if genres else "",
+        "description": doc.get("description", ""),
+        "thumbnail": images.thumbnail_url(doc.get("thumbnail")),
+        "link": doc["url"],
+    }
+
+
+def search(query, limit=SEARCH_LOCAL_LIMIT):
+    """Hasil dari index lokal, [] kalau tidak ada yang cocok, None kalau index tidak tersedia."""
+    index = current()
+    if index is None or not len(index):
+        return None
+    return [to_result(doc) for doc in index.search(query, limit)]
@@ -0,0 +1,55 @@
+# Launcher produksi, pengganti app.run():
+#   SERVER_MODE=asgi python serve.py   -> asgi.py (Quart) di uvicorn
+#   python serve.py                    -> app.py (Flask) di gunicorn (gthread)
+#   SERVER_WORKERS=4 python serve.py   -> 4 proses gunicorn (preload), cache/limiter dibagi lewat SHARED_DIR
+import argparse
+import os
+import sys
+
+from config import SERVER_MODE, SERVER_HOST, SERVER_WORKERS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _gunicorn(mode, host, port, workers):
+    # exec: master gunicorn menggantikan proses ini dan menerima sinyal (HUP/USR2/TERM) langsung
+    # gunicorn.conf.py memilih worker class dari SERVER_MODE: --mode harus ikut ke sana
+    os.environ["SERVER_MODE"] = mode
+    os.environ["SERVER_WORKERS"] = str(workers)
+    os.environ["PORT"] = str(port)
+    os.chdir(HERE)
+    os.execv(sys.executable, [
+        sys.executable, "-m", "gunicorn", "-c", os.path.join(HERE, "gunicorn.conf.py"),
+        "--bind", f"{host}:{port}", "asgi:app" if mode == "asgi" else "app:app",
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Jalankan API mangaku")
+    parser.add_argument("--mode", choices=["wsgi", "asgi"], default=SERVER_MODE)
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS,
+                        help="jumlah proses gunicorn (SERVER_WORKERS)")
+    args = parser.parse_args()
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        # gunicorn hanya untuk POSIX: tanpa gunicorn, satu proses seperti sebelumnya
+        gunicorn = None
+
+    if gunicorn is not None and (args.mode == "wsgi" or args.workers > 1):
+        _gunicorn(args.mode, args.host, args.port, args.workers)
+    elif args.mode == "asgi":
+        import uvicorn
+
+        uvicorn.run("asgi:app", host=args.host, port=args.port, proxy_headers=True)
+    else:
+        from app import app
+
+        app.run(host=args.host, port=args.port, debug=False, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import asyncio
+import threading
+
+import metrics
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Gabungkan pemanggilan identik yang berjalan bersamaan.
+
+    Pemanggil pertama untuk sebuah key menjalankan fn, pemanggil lain dengan
+    key yang sama menunggu dan menerima hasil (atau exception) yang sama.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def do(self, kind, key, fn):
+        key = (kind, key)
+        with self._lock:
+            stats = self._stats.setdefault(kind, {"calls": 0, "coalesced": 0})
+            stats["calls"] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                stats["coalesced"] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def stats(self):
+        with self._lock:
+            stats = {k: dict(v) for k, v in self._stats.items()}
+            in_flight = len(self._calls)
+        for s in stats.values():
+            s["ratio"] = round(s["coalesced"] / s["calls"], 4) if s["calls"] else 0.0
+        stats["in_flight"] = in_flight
+        return stats
+
+
+class AsyncSingleFlight:
+    """Versi asyncio dari SingleFlight, untuk satu event loop.
+
+    fn dijalankan sebagai task terpisah yang ditunggu semua pemanggil lewat shield:
+    pemanggil yang dibatalkan (klien putus, /batch membatalkan task-nya) hanya
+    berhenti menunggu, pemanggil lain tetap menerima hasilnya.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._stats = {}
+
+    async def do(self, kind, key, fn):
+        key = (kind, key)
+        stats = self._stats.setdefault(kind, {"calls": 0, "coalesced": 0})
+        stats["calls"] += 1
+        task = self._calls.get(key)
+        if task is not None:
+            stats["coalesced"] += 1
+        else:
+            task = self._calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # tandai sudah diambil walau semua pemanggil sudah batal
+
+    def stats(self):
+        stats = {k: dict(v) for k, v in self._stats.items()}
+        for s in stats.values():
+            s["ratio"] = round(s["coalesced"] / s["calls"], 4) if s["calls"] else 0.0
+        stats["in_flight"] = len(self._calls)
+        return stats
+
+
+flight = SingleFlight()
+aflight = AsyncSingleFlight()
+
+
+@metrics.registry.collector
+def _collect():
+    calls, coalesced = [], []
+    for mode, sf in (("sync", flight), ("async", aflight)):
+        for kind, s in sf.stats().items():
+            if kind == "in_flight":
+                continue
+            calls.append(({"mode": mode, "kind": kind}, s["calls"]))
+            coalesced.append(({"mode": mode, "kind": kind}, s["coalesced"]))
+    yield "mangaku_singleflight_calls_total", "counter", "Pemanggilan single-flight", calls
+    yield "mangaku_singleflight_coalesced_total", "counter", "Pemanggilan yang menumpang hasil pemanggilan lain", coalesced
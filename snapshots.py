@@ -0,0 +1,351 @@
+import argparse
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+
+import encoding
+import metrics
+from config import SNAPSHOT_DIR, SNAPSHOT_KEEP, SNAPSHOT_MAX_BYTES, SNAPSHOT_MEMO_SIZE, SNAPSHOT_QUEUE_SIZE
+
+try:
+    import zstandard
+except ImportError:
+    # tanpa zstandard: zlib dari stdlib
+    zstandard = None
+
+log = logging.getLogger(__name__)
+
+# HTML upstream yang sudah di-fetch tidak langsung dibuang:
+# - parse(kind, url, html, fn): kalau HTML untuk (kind, url) identik byte-per-byte dengan
+#   yang terakhir di-parse, hasil parse sebelumnya dipakai lagi tanpa BeautifulSoup.
+# - Setiap versi berbeda per URL disimpan terkompresi di SNAPSHOT_DIR (file dinamai sha256
+#   isinya, index di SQLite), jadi perubahan markup Komiku bisa dilacak dan snapshot bisa
+#   dipakai ulang sebagai fixture (`python bench/fixtures.py --from-snapshots`).
+#
+#   python snapshots.py list                         -> URL yang punya snapshot
+#   python snapshots.py history <url>                -> versi-versi satu URL
+#   python snapshots.py show <url> [--digest <d>]    -> HTML versi terakhir (atau versi tertentu)
+
+CODEC = "zst" if zstandard is not None else "zz"
+
+
+def content_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _compress(data):
+    if CODEC == "zst":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return zlib.compress(data, 6)
+
+
+def _decompress(blob, codec):
+    if codec == "zst":
+        if zstandard is None:
+            raise RuntimeError("snapshot zstd butuh modul zstandard")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return zlib.decompress(blob)
+
+
+# --- STORE DI DISK ---
+class SnapshotStore:
+    """Versi HTML per URL: satu baris per perubahan isi, file terkompresi dinamai sha256 isinya.
+
+    Fetch ulang dengan isi sama hanya memperbarui last_seen. Versi lebih lama dari `keep`
+    terakhir dibuang; file yang masih dipakai URL lain (isi sama) tidak ikut dihapus.
+    Total dibatasi `max_bytes`: versi yang paling lama tidak terlihat dibuang lebih dulu (LRU).
+    """
+
+    EVICT_EVERY = 20
+
+    def __init__(self, root, keep, max_bytes):
+        self.root = root
+        self.keep = max(1, keep)
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(root, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL, digest TEXT NOT NULL,"
+            " codec TEXT NOT NULL, size INTEGER NOT NULL, stored INTEGER NOT NULL,"
+            " first_seen REAL NOT NULL, last_seen REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS snapshots_url ON snapshots (url, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS snapshots_digest ON snapshots (digest)")
+        conn.execute("CREATE INDEX IF NOT EXISTS snapshots_last_seen ON snapshots (last_seen)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(os.path.join(self.root, "index.sqlite3"), timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def file(self, digest, codec):
+        return os.path.join(self.root, digest[:2], f"{digest}.{codec}")
+
+    def _latest(self, url):
+        return self._conn().execute(
+            "SELECT id, digest, codec FROM snapshots WHERE url = ? ORDER BY id DESC LIMIT 1", (url,)
+        ).fetchone()
+
+    def record(self, url, data, digest):
+        """Simpan `data` (bytes HTML) sebagai versi terbaru url. True kalau versi baru."""
+        conn = self._conn()
+        now = time.time()
+        latest = self._latest(url)
+        if latest is not None and latest[1] == digest:
+            conn.execute("UPDATE snapshots SET last_seen = ? WHERE id = ?", (now, latest[0]))
+            return False
+        path = self.file(digest, CODEC)
+        blob = None
+        if not os.path.exists(path):
+            blob = _compress(data)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(blob)
+                os.replace(tmp, path)
+            except BaseException:
+                with suppress(FileNotFoundError):
+                    os.remove(tmp)
+                raise
+        stored = len(blob) if blob is not None else os.path.getsize(path)
+        conn.execute(
+            "INSERT INTO snapshots (url, digest, codec, size, stored, first_seen, last_seen)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (url, digest, CODEC, len(data), stored, now, now),
+        )
+        self.prune(url)
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            self.evict()
+        return True
+
+    def _drop(self, conn, id_, digest, codec):
+        conn.execute("DELETE FROM snapshots WHERE id = ?", (id_,))
+        if conn.execute("SELECT 1 FROM snapshots WHERE digest = ? LIMIT 1", (digest,)).fetchone() is None:
+            with suppress(FileNotFoundError):
+                os.remove(self.file(digest, codec))
+            return True
+        return False
+
+    def prune(self, url):
+        conn = self._conn()
+        rows = conn.execute(
+            "SELECT id, digest, codec FROM snapshots WHERE url = ? ORDER BY id DESC LIMIT -1 OFFSET ?",
+            (url, self.keep),
+        ).fetchall()
+        for id_, digest, codec in rows:
+            self._drop(conn, id_, digest, codec)
+
+    def evict(self):
+        total = self.stats()["bytes"]
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        conn = self._conn()
+        rows = conn.execute("SELECT id, digest, codec, stored FROM snapshots ORDER BY last_seen").fetchall()
+        for id_, digest, codec, stored in rows:
+            if self._drop(conn, id_, digest, codec):
+                total -= stored
+            if total <= target:
+                break
+
+    def load(self, url, digest=None):
+        """HTML versi terakhir url (atau versi `digest`), None kalau tidak ada."""
+        if digest is None:
+            row = self._latest(url)
+        else:
+            row = self._conn().execute(
+                "SELECT id, digest, codec FROM snapshots WHERE url = ? AND digest LIKE ? ORDER BY id DESC LIMIT 1",
+                (url, digest + "%"),
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            with open(self.file(row[1], row[2]), "rb") as f:
+                return _decompress(f.read(), row[2]).decode("utf-8")
+        except FileNotFoundError:
+            return None
+
+    def history(self, url):
+        rows = self._conn().execute(
+            "SELECT digest, size, stored, first_seen, last_seen FROM snapshots WHERE url = ? ORDER BY id DESC",
+            (url,),
+        ).fetchall()
+        return [dict(zip(("digest", "size", "stored", "first_seen", "last_seen"), row)) for row in rows]
+
+    def urls(self):
+        return self._conn().execute(
+            "SELECT url, COUNT(*), MAX(last_seen) FROM snapshots GROUP BY url ORDER BY url"
+        ).fetchall()
+
+    def stats(self):
+        urls, versions = self._conn().execute("SELECT COUNT(DISTINCT url), COUNT(*) FROM snapshots").fetchone()
+        files, size = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(stored), 0) FROM"
+            " (SELECT digest, MAX(stored) AS stored FROM snapshots GROUP BY digest)"
+        ).fetchone()
+        return {"urls": urls, "versions": versions, "files": files, "bytes": size,
+                "max_bytes": self.max_bytes, "codec": CODEC}
+
+
+store = SnapshotStore(SNAPSHOT_DIR, SNAPSHOT_KEEP, SNAPSHOT_MAX_BYTES) if SNAPSHOT_DIR else None
+
+# --- MEMO HASIL PARSE ---
+# (kind, url) -> (digest, hasil parse dalam JSON). Disimpan sebagai JSON supaya setiap
+# pemanggil dapat salinan baru (hasil parse dimodifikasi / di-cache di tempat lain).
+_memo = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hit": 0, "miss": 0, "versions": 0, "error": 0, "dropped": 0}
+# kompresi + tulis SQLite di satu thread background, bukan di request (atau event loop ASGI)
+_executor = None
+_executor_pid = None
+_pending = 0
+
+
+def _count(name):
+    with _lock:
+        _stats[name] += 1
+
+
+def stats():
+    with _lock:
+        result = dict(_stats)
+        result["memo"] = len(_memo)
+        result["pending"] = _pending
+    result["store"] = store.stats() if store is not None else None
+    return result
+
+
+def _write(url, data, digest):
+    global _pending
+    try:
+        if store.record(url, data, digest):
+            _count("versions")
+    except (OSError, sqlite3.Error) as e:
+        # snapshot hanya jejak audit: gagal simpan tidak boleh mengganggu request
+        _count("error")
+        log.warning("snapshot %s failed: %s", url, e)
+    finally:
+        with _lock:
+            _pending -= 1
+
+
+def _record(url, data, digest):
+    global _executor, _executor_pid, _pending
+    if store is None:
+        return
+    with _lock:
+        if _pending >= SNAPSHOT_QUEUE_SIZE:
+            _stats["dropped"] += 1
+            return
+        _pending += 1
+        # executor dibuat per proses: thread tidak ikut ke worker hasil fork
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(1, thread_name_prefix="snapshot")
+            _executor_pid = os.getpid()
+            _pending = 1
+        executor = _executor
+    executor.submit(_write, url, data, digest)
+
+
+def record(url, html):
+    """Simpan snapshot tanpa parse (mis. detail yang di-stream)."""
+    data = html.encode("utf-8")
+    _record(url, data, content_digest(data))
+
+
+def parse(kind, url, html, parse_fn):
+    """parse_fn(html), atau hasil sebelumnya kalau HTML untuk (kind, url) tidak berubah.
+
+    `kind` membedakan parser/argumen untuk URL yang sama (mis. "detail:<slug>").
+    """
+    data = html.encode("utf-8")
+    digest = content_digest(data)
+    key = (kind, url)
+    with _lock:
+        found = _memo.get(key)
+        if found is not None and found[0] == digest:
+            _memo.move_to_end(key)
+            _stats["hit"] += 1
+        else:
+            found = None
+            _stats["miss"] += 1
+    if found is not None:
+        return encoding.loads(found[1])
+    # simpan dulu: kalau markup baru membuat parser gagal, snapshot-nya tetap ada
+    _record(url, data, digest)
+    result = parse_fn(html)
+    if SNAPSHOT_MEMO_SIZE > 0:
+        payload = encoding.dumps(result)
+        with _lock:
+            _memo[key] = (digest, payload)
+            _memo.move_to_end(key)
+            while len(_memo) > SNAPSHOT_MEMO_SIZE:
+                _memo.popitem(last=False)
+    return result
+
+
+async def aparse(kind, url, html, parse_fn):
+    """parse() di thread: BeautifulSoup/lxml tidak menahan event loop (mode ASGI)."""
+    return await asyncio.to_thread(parse, kind, url, html, parse_fn)
+
+
+@metrics.registry.collector
+def _collect():
+    s = stats()
+    yield "mangaku_parse_memo_total", "counter", "Parse HTML per hasil memo (hit = HTML identik, tidak di-parse)", [
+        ({"result": "hit"}, s["hit"]), ({"result": "miss"}, s["miss"])]
+    yield "mangaku_snapshot_versions_total", "counter", "Versi HTML baru yang disimpan ke snapshot", [
+        ({}, s["versions"])]
+    yield "mangaku_snapshot_dropped_total", "counter", "Snapshot yang dilewati karena antrian penuh", [
+        ({}, s["dropped"])]
+    if s["store"] is not None:
+        yield "mangaku_snapshot_bytes", "gauge", "Ukuran snapshot terkompresi di disk", [({}, s["store"]["bytes"])]
+
+
+def _main():
+    parser = argparse.ArgumentParser(description="Snapshot HTML upstream mangaku")
+    parser.add_argument("command", choices=["list", "history", "show"])
+    parser.add_argument("url", nargs="?")
+    parser.add_argument("--digest", help="prefix sha256 versi yang ditampilkan (default: terbaru)")
+    args = parser.parse_args()
+    if store is None:
+        parser.error('SNAPSHOT_DIR=""')
+    if args.command == "list":
+        for url, versions, last_seen in store.urls():
+            print(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(last_seen))}  {versions:3d}  {url}")
+        return
+    if not args.url:
+        parser.error(f"{args.command} butuh url")
+    if args.command == "history":
+        for v in store.history(args.url):
+            first = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(v["first_seen"]))
+            last = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(v["last_seen"]))
+            print(f"{v['digest'][:16]}  {first} .. {last}  {v['size']} -> {v['stored']} byte")
+        return
+    html = store.load(args.url, args.digest)
+    if html is None:
+        sys.exit(f"tidak ada snapshot untuk {args.url}")
+    sys.stdout.write(html)
+
+
+if __name__ == "__main__":
+    _main()